@@ -1,6 +1,6 @@
 # car.py
 import math
-import time
+from collections import OrderedDict
 
 import pygame
 
@@ -15,8 +15,14 @@ class Car:
     통합 규칙:
     - 생성자: Car(x, y) 형태 유지 (색은 setattr로 바꿀 수 있음)
     - draw(screen, emote_imgs=None) 형태 유지 (emote_imgs는 선택)
+    - 회전된 차체 스프라이트는 (색상, 아이템 보유, 양자화 각도) 키로 캐시 (LRU, 최대 SPRITE_CACHE_MAX개)
     """
 
+    # 회전 스프라이트 캐시 (모든 차량 공유)
+    ANGLE_STEPS = 256
+    SPRITE_CACHE_MAX = 2048
+    _sprite_cache: "OrderedDict[tuple, pygame.Surface]" = OrderedDict()
+
     def __init__(self, x, y, body_color=(230, 230, 230), nose_color=(255, 80, 80)):
         # 상태
         self.x = float(x)
@@ -42,7 +48,8 @@ class Car:
 
         # 감정표현
         self.emote_id = 0
-        self.emote_end_time = 0.0
+        self.emote_timer = 0.0  # 남은 표시 시간 (시뮬레이션 시계, Simulation.step에서 감소)
+        self.emote_duration = 2.5
 
         # 아이템/부스트
         self.has_item = False
@@ -53,7 +60,13 @@ class Car:
     # --- 감정표현 ---
     def set_emote(self, emote_id: int):
         self.emote_id = int(emote_id)
-        self.emote_end_time = time.time() + 2.5
+        self.emote_timer = self.emote_duration
+
+    def update_emote(self, dt: float):
+        if self.emote_timer > 0.0:
+            self.emote_timer = max(0.0, self.emote_timer - dt)
+            if self.emote_timer <= 0.0:
+                self.emote_id = 0
 
     # --- 아이템/부스트 ---
     def activate_boost(self):
@@ -108,7 +121,7 @@ class Car:
         self.y += vy * dt
 
     # --- 렌더링 ---
-    def draw(self, screen: pygame.Surface, emote_imgs=None):
+    def _render_body(self) -> pygame.Surface:
         # 차체
         car_surf = pygame.Surface((self.W, self.H), pygame.SRCALPHA)
         pygame.draw.rect(car_surf, self.body_color, pygame.Rect(0, 0, self.W, self.H), border_radius=6)
@@ -119,21 +132,37 @@ class Car:
         # 아이템 보유 표시
         if self.has_item:
             pygame.draw.circle(car_surf, (0, 200, 255), (self.W // 2, self.H // 2), 3)
-
-        rotated = pygame.transform.rotate(car_surf, -math.degrees(self.angle))
-        rect = rotated.get_rect(center=(self.x, self.y))
-        screen.blit(rotated, rect.topleft)
-
-        # 감정표현(이모트)
-        now = time.time()
-        if self.emote_id > 0:
-            if now < self.emote_end_time:
-                if emote_imgs and self.emote_id in emote_imgs:
-                    img = emote_imgs[self.emote_id]
-                    cx, cy = self.x, self.y - 40
-                    screen.blit(img, img.get_rect(center=(cx, cy)))
-            else:
-                self.emote_id = 0
+        return car_surf
+
+    def get_sprite(self) -> pygame.Surface:
+        step = round(self.angle / (2 * math.pi) * self.ANGLE_STEPS) % self.ANGLE_STEPS
+        key = (self.body_color, self.nose_color, self.has_item, self.W, self.H, step)
+
+        cache = Car._sprite_cache
+        sprite = cache.get(key)
+        if sprite is not None:
+            cache.move_to_end(key)
+            return sprite
+
+        degrees = step * 360.0 / self.ANGLE_STEPS
+        sprite = pygame.transform.rotate(self._render_body(), -degrees)
+        cache[key] = sprite
+        if len(cache) > self.SPRITE_CACHE_MAX:
+            cache.popitem(last=False)
+        return sprite
+
+    def draw(self, screen: pygame.Surface, emote_imgs=None) -> pygame.Rect:
+        """그린 영역(차체 + 이모트)을 반환 (더티 렉트 렌더링용)"""
+        sprite = self.get_sprite()
+        rect = sprite.get_rect(center=(self.x, self.y))
+        drawn = screen.blit(sprite, rect.topleft)
+
+        # 감정표현(이모트): 만료는 Simulation.step이 처리 (emote_id가 0이 되면 사라짐)
+        if self.emote_id > 0 and emote_imgs and self.emote_id in emote_imgs:
+            img = emote_imgs[self.emote_id]
+            cx, cy = self.x, self.y - 40
+            drawn = drawn.union(screen.blit(img, img.get_rect(center=(cx, cy))))
+        return drawn
 
     def get_aabb_rect(self):
         return pygame.Rect(int(self.x - self.W / 2), int(self.y - self.H / 2), self.W, self.H)
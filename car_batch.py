@@ -0,0 +1,122 @@
+# car_batch.py
+import numpy as np
+
+from car import Car
+
+
+class CarBatch:
+    """
+    여러 대의 Car 물리를 NumPy 배열(struct-of-arrays)로 한 번에 진행:
+    - x, y, angle, speed, boost_timer, has_item + 튜닝 상수를 차량별 배열로 보관
+    - update_control()은 Car.update_control()과 같은 연산 순서를 그대로 벡터화
+      (8~64대 레이스, 오프라인 대량 시뮬레이션용)
+    - 벽 충돌/슬라이딩은 Track 쪽 책임이라 여기서는 다루지 않음
+    """
+
+    def __init__(self, n: int):
+        self.n = int(n)
+
+        # 상태
+        self.x = np.zeros(self.n)
+        self.y = np.zeros(self.n)
+        self.angle = np.zeros(self.n)
+        self.speed = np.zeros(self.n)
+        self.boost_timer = np.zeros(self.n)
+        self.has_item = np.zeros(self.n, dtype=bool)
+
+        # 튜닝 파라미터 (Car 기본값)
+        proto = Car(0, 0)
+        self.ACCEL = np.full(self.n, proto.ACCEL)
+        self.BRAKE = np.full(self.n, proto.BRAKE)
+        self.FRICTION = np.full(self.n, proto.FRICTION)
+        self.TURN_SPEED = np.full(self.n, proto.TURN_SPEED)
+        self.MAX_SPEED = np.full(self.n, proto.MAX_SPEED)
+        self.boost_duration = np.full(self.n, proto.boost_duration)
+        self.boost_factor = np.full(self.n, proto.boost_factor)
+
+        # 차량 크기 (전 차량 공통)
+        self.W = proto.W
+        self.H = proto.H
+
+    # --- Car <-> 배열 변환 ---
+    @classmethod
+    def from_cars(cls, cars: list[Car]) -> "CarBatch":
+        batch = cls(len(cars))
+        for i, c in enumerate(cars):
+            batch.x[i] = c.x
+            batch.y[i] = c.y
+            batch.angle[i] = c.angle
+            batch.speed[i] = c.speed
+            batch.boost_timer[i] = c.boost_timer
+            batch.has_item[i] = c.has_item
+
+            batch.ACCEL[i] = c.ACCEL
+            batch.BRAKE[i] = c.BRAKE
+            batch.FRICTION[i] = c.FRICTION
+            batch.TURN_SPEED[i] = c.TURN_SPEED
+            batch.MAX_SPEED[i] = c.MAX_SPEED
+            batch.boost_duration[i] = c.boost_duration
+            batch.boost_factor[i] = c.boost_factor
+        return batch
+
+    def write_back(self, cars: list[Car]):
+        for i, c in enumerate(cars):
+            c.x = float(self.x[i])
+            c.y = float(self.y[i])
+            c.angle = float(self.angle[i])
+            c.speed = float(self.speed[i])
+            c.boost_timer = float(self.boost_timer[i])
+            c.has_item = bool(self.has_item[i])
+
+    # --- 아이템/부스트 ---
+    def activate_boost(self, mask):
+        use = np.asarray(mask, dtype=bool) & self.has_item
+        self.has_item &= ~use
+        self.boost_timer = np.where(use, self.boost_duration, self.boost_timer)
+
+    # --- 업데이트 ---
+    def update_control(self, dt: float, throttle, brake, left, right):
+        """throttle/brake/left/right: 길이 n의 bool 배열"""
+        throttle = np.asarray(throttle, dtype=bool)
+        brake = np.asarray(brake, dtype=bool)
+        left = np.asarray(left, dtype=bool)
+        right = np.asarray(right, dtype=bool)
+
+        # 부스트 상태에 따라 최대 속도/가속도 증가
+        boosting = self.boost_timer > 0.0
+        self.boost_timer = np.where(boosting, np.maximum(0.0, self.boost_timer - dt), self.boost_timer)
+        current_max_speed = np.where(boosting, self.MAX_SPEED * self.boost_factor, self.MAX_SPEED)
+        current_accel = np.where(boosting, self.ACCEL * self.boost_factor, self.ACCEL)
+
+        # 가속/브레이크/마찰 (throttle > brake > 마찰 우선순위)
+        coast = ~throttle & ~brake
+        friction = self.FRICTION * dt
+        speed = self.speed
+        speed = np.where(throttle, speed + current_accel * dt, speed)
+        speed = np.where(~throttle & brake, speed - self.BRAKE * dt, speed)
+        speed = np.where(coast & (speed > 0), np.maximum(0.0, speed - friction), speed)
+        speed = np.where(coast & (speed < 0), np.minimum(0.0, speed + friction), speed)
+
+        # 속도 제한(후진은 약 40%)
+        speed = np.maximum(-current_max_speed * 0.4, np.minimum(current_max_speed, speed))
+        self.speed = speed
+
+        # 회전 (속도가 어느 정도 있을 때만) - Car와 같은 순서로 left 먼저 적용
+        turning = np.abs(speed) > 5
+        turn = self.TURN_SPEED * dt
+        angle = self.angle
+        angle = np.where(turning & left, angle - turn, angle)
+        angle = np.where(turning & right, angle + turn, angle)
+        self.angle = angle
+
+        # 위치 업데이트
+        vx = np.cos(angle) * speed
+        vy = np.sin(angle) * speed
+        self.x = self.x + vx * dt
+        self.y = self.y + vy * dt
+
+    def get_aabb_rects(self):
+        """Car.get_aabb_rect()와 같은 int 절사 규칙의 (x, y, w, h) 배열"""
+        left = (self.x - self.W / 2).astype(np.int64)
+        top = (self.y - self.H / 2).astype(np.int64)
+        return np.stack([left, top, np.full(self.n, self.W), np.full(self.n, self.H)], axis=1)
@@ -0,0 +1,48 @@
+# dirty_rect.py
+import pygame
+
+
+class DirtyRectRenderer:
+    """
+    더티 렉트 렌더링:
+    - begin(background): 지난 프레임에 그린 영역만 캐시된 배경으로 복원
+    - add(rect): 이번 프레임에 그린 동적 요소(차/아이템/이모트/HUD)의 영역 기록
+    - present(): 이전+현재 영역만 pygame.display.update(rects)로 전송
+    - invalidate(): 오버레이/맵 변경처럼 화면 전체가 바뀌면 이번 프레임은 flip, 다음 프레임은 전체 복원
+    """
+
+    def __init__(self, screen: pygame.Surface):
+        self.screen = screen
+        self._prev: list[pygame.Rect] = []
+        self._cur: list[pygame.Rect] = []
+        self._full_restore = True
+        self._full_present = True
+
+    def invalidate(self):
+        self._full_restore = True
+        self._full_present = True
+
+    def begin(self, background: pygame.Surface):
+        if self._full_restore:
+            self.screen.blit(background, (0, 0))
+            self._full_restore = False
+            self._full_present = True
+        else:
+            for r in self._prev:
+                self.screen.blit(background, r.topleft, r)
+
+    def add(self, rect: pygame.Rect | None):
+        if rect is None:
+            return
+        r = pygame.Rect(rect).clip(self.screen.get_rect())
+        if r.width > 0 and r.height > 0:
+            self._cur.append(r)
+
+    def present(self):
+        if self._full_present:
+            pygame.display.flip()
+        else:
+            pygame.display.update(self._prev + self._cur)
+        self._full_present = False
+        self._prev = self._cur
+        self._cur = []
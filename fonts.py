@@ -0,0 +1,50 @@
+# fonts.py
+"""
+폰트 / 텍스트 렌더 캐시:
+- get_font(): SysFont 객체를 (name, size, bold) 별로 한 번만 생성해서 공유
+- render_text(): (font, text, color) 별 렌더 결과 Surface를 LRU로 보관 (최대 TEXT_CACHE_MAX개)
+- get_overlay(): 반투명 전체화면 오버레이처럼 고정된 Surface 재사용
+"""
+from collections import OrderedDict
+
+import pygame
+
+TEXT_CACHE_MAX = 512
+
+_fonts: dict[tuple, pygame.font.Font] = {}
+_text_cache: "OrderedDict[tuple, pygame.Surface]" = OrderedDict()
+_overlays: dict[tuple, pygame.Surface] = {}
+
+
+def get_font(name: str | None, size: int, bold: bool = False) -> pygame.font.Font:
+    key = (name, size, bold)
+    font = _fonts.get(key)
+    if font is None:
+        font = pygame.font.SysFont(name, size, bold=bold)
+        _fonts[key] = font
+    return font
+
+
+def render_text(font: pygame.font.Font, text: str, color, antialias: bool = True) -> pygame.Surface:
+    key = (font, text, tuple(color), antialias)
+    surf = _text_cache.get(key)
+    if surf is not None:
+        _text_cache.move_to_end(key)
+        return surf
+
+    surf = font.render(text, antialias, color)
+    _text_cache[key] = surf
+    if len(_text_cache) > TEXT_CACHE_MAX:
+        _text_cache.popitem(last=False)
+    return surf
+
+
+def get_overlay(size: tuple[int, int], color=(0, 0, 0), alpha: int = 150) -> pygame.Surface:
+    key = (tuple(size), tuple(color), alpha)
+    overlay = _overlays.get(key)
+    if overlay is None:
+        overlay = pygame.Surface(size)
+        overlay.set_alpha(alpha)
+        overlay.fill(color)
+        _overlays[key] = overlay
+    return overlay
@@ -1,28 +1,15 @@
 # game.py
-import os
-import random
-import threading
 import time
-from dataclasses import dataclass
 
 import pygame
 
-import network
-from car import Car
-from track import Track
+from dirty_rect import DirtyRectRenderer
+from fonts import get_font, get_overlay, render_text
+from netcode import InputHistory, InputSender, SnapshotBuffer, SnapshotReceiver
 from resource import resource_path
-
-
-# -----------------------------
-# Item (cyan pickup)
-# -----------------------------
-class Item:
-    def __init__(self, x: int, y: int):
-        self.rect = pygame.Rect(int(x), int(y), 16, 16)
-        self.color = (0, 255, 255)
-
-    def draw(self, screen: pygame.Surface):
-        pygame.draw.rect(screen, self.color, self.rect, border_radius=4)
+from room import RoomHost
+from simulation import PlayerInput, Simulation
+from transport import Transport
 
 
 class Game:
@@ -30,6 +17,7 @@ class Game:
     game.py (통합판)
     - game2.py 기능: 맵 선택(1~5), 이모트(1~5), 아이템/부스트, 리매치 투표, LAN host/client 동기화
     - game.py 기능: host time 기반 카운트다운(start_at/go_until/race_started) 동기화(클라 offset 스무딩)
+    - 레이스 규칙/물리는 Simulation이 담당, Game은 입력 수집 + 네트워크 + 렌더링 셸
     """
 
     def __init__(
@@ -41,6 +29,10 @@ class Game:
         port: int = 5000,
         room_name: str = "Room",
         room_id: str = "RACE01",
+        dirty_rects: bool = False,
+        wire: str = "binary",
+        udp: bool = True,
+        spectator: bool = False,
     ):
         self.screen = screen
         self.clock = clock
@@ -52,56 +44,29 @@ class Game:
         self.port = port
         self.room_name = room_name
         self.room_id = room_id
+        self.wire = wire  # "binary" | "json" (binary는 상대도 지원할 때만 사용)
+        self.use_udp = udp  # state/input을 UDP로 (제어 메시지는 항상 TCP)
+        self.spectator = spectator and mode == "client"  # 관전: 입력/투표 없이 state만 수신
 
         self.width = screen.get_width()
         self.height = screen.get_height()
 
         # -----------------------------
-        # Track / Map
+        # Simulation (Track / Cars / Items / Checkpoints / Countdown)
         # -----------------------------
         self.current_map_id = 0
-        self.track = Track(self.current_map_id)
-
-        # -----------------------------
-        # Cars
-        # -----------------------------
-        self.car1 = Car(300, 540)
-        self.car2 = Car(350, 540)
-        # Car 쪽에 속성이 없을 수도 있으니 setattr로 안전하게
-        setattr(self.car1, "body_color", (230, 230, 230))
-        setattr(self.car1, "nose_color", (255, 80, 80))
-        setattr(self.car2, "body_color", (120, 160, 255))
-        setattr(self.car2, "nose_color", (255, 255, 80))
+        self.sim = Simulation(self.current_map_id, num_players=2, width=self.width, height=self.height)
+        self.track = self.sim.track
 
-        # -----------------------------
-        # Game state
-        # -----------------------------
-        self.cp_index1 = 0
-        self.cp_index2 = 0
-        self.winner: str | None = None
-
-        # 결과 화면 타이머 및 투표 상태
+        # 결과 화면 타이머 및 투표 상태 (플레이어 인덱스별, host는 room.votes 사용)
         self.finish_time: float | None = None
-        self.rematch_p1: bool | None = None
-        self.rematch_p2: bool | None = None
+        self.votes: list[bool | None] = [None] * len(self.sim.cars)
         self.match_running = False
 
         # -----------------------------
         # Countdown sync (from old game.py)
         # -----------------------------
-        self.countdown_total = 3.0
-        self.show_go_time = 0.6
-        self.start_at: float | None = None
-        self.go_until: float | None = None
-        self.race_started = False
-        self.time_offset = 0.0  # client: (server_time - local_time)
-
-        # -----------------------------
-        # Items / boost
-        # -----------------------------
-        self.items: list[Item] = []
-        self.item_spawn_timer = 0.0
-        self.ITEM_SPAWN_INTERVAL = 5.0
+        self.time_offset = 0.0  # client: (server_time - local_time), host 시계 동기화(net.clock)로 계산
 
         # -----------------------------
         # Key maps (boost key added)
@@ -125,53 +90,83 @@ class Game:
         # UI
         # -----------------------------
         self.show_hud = True
-        self.font = pygame.font.SysFont(None, 22)
-        self.big_font = pygame.font.SysFont("Arial", 40, bold=True)
-        self.rank_font = pygame.font.SysFont("Arial", 60, bold=True)
+        self.font = get_font(None, 22)
+        self.big_font = get_font("Arial", 40, bold=True)
+        self.rank_font = get_font("Arial", 60, bold=True)
+
+        # 더티 렉트 렌더링 (저사양/소프트웨어 렌더링 환경용, 선택)
+        self.renderer = DirtyRectRenderer(screen) if dirty_rects else None
 
         # -----------------------------
         # Emote images
         # -----------------------------
         self.emote_imgs: dict[int, pygame.Surface] = {}
         self._load_emote_images()
-        self.client_pending_emote = 0
+        self.pending_emote = 0
 
         # -----------------------------
         # Network
         # -----------------------------
-        self.net = None  # JsonLineSocket
-        self._net_thread = None
-        self._broadcast_thread = None
-        self._broadcast_stop = threading.Event()
-
-        self.remote_input = {
-            "throttle": False,
-            "brake": False,
-            "left": False,
-            "right": False,
-            "boost": False,
-            "emote_req": 0,
-        }
+        # 소켓 I/O는 Transport 이벤트 루프 스레드가 처리하고,
+        # 받은 메시지는 게임 루프가 프레임마다 _poll_network()로 꺼내서 처리
+        self.transport = None
+        self.room = None  # host: RoomHost (접속한 client 전원 관리)
+        self.net = None  # client: transport.Connection
         self.latest_state = None
 
-        # 게임 시작 시 초기 아이템 생성 (호스트/로컬만)
-        if self.mode != "client":
-            self._spawn_initial_items()
+        # delta 스냅샷: client는 host가 보낸 baseline + delta로 복원
+        self.snapshot_rx = SnapshotReceiver()
+
+        # UDP state/input 채널 (udp_ready가 되기 전까지는 TCP로 보냄)
+        self.udp = None  # transport.UdpEndpoint
+        self.udp_ready = False
+        self.input_seq = 0
+        # input은 바뀔 때(+redundancy) / keep-alive 주기에만 전송 (seq는 틱마다 증가)
+        self.input_sender = InputSender()
+        # 보낸 emote (값, 처음 실은 input seq): 수신 측이 오래된 input을 건너뛰므로 host ack까지 반복 전송
+        self._emote_out = None
+
+        # client 예측: 내 차를 로컬에서 먼저 움직이고, host ack 이후 입력만 재적용
+        # (client의 차 인덱스는 host welcome으로 확정, 관전자는 None)
+        self.player_index = 1 if self.mode == "client" else 0
+        if self.spectator:
+            self.player_index = None
+        self.input_history = InputHistory()
+        self._predict_accum = 0.0
+        self._applied_state = None
+
+        # client 보간: 원격 차량은 INTERP_DELAY초 과거 시점으로 스냅샷 사이 보간
+        self.snapshot_buffer = SnapshotBuffer()
+        self.INTERP_DELAY = 0.1
+        if self.spectator:
+            # 관전 state는 낮은 주기로 오므로 스냅샷 2~3개 사이를 보간하도록 지연을 늘림
+            self.INTERP_DELAY = 0.25
 
         if self.mode == "host":
-            self._srv = network.tcp_host_listen(self.port)
-            self._broadcast_thread = threading.Thread(
-                target=network.broadcast_room,
-                args=(self.room_id, self.room_name, self.port, 0.5, self._broadcast_stop),
-                daemon=True,
+            self.transport = Transport()
+            # host 화면 앞 플레이어가 P1, client는 접속 순서대로 P2..P8
+            # (state 전송 주기 30Hz: 보간 덕분에 틱레이트보다 낮아도 부드러움)
+            self.room = RoomHost(
+                self.transport,
+                self.sim,
+                self.port,
+                self.room_id,
+                self.room_name,
+                binary=self.wire == "binary",
+                udp=self.use_udp,
             )
-            self._broadcast_thread.start()
 
         elif self.mode == "client":
-            s = network.tcp_client_connect(self.host_ip, self.port)
-            self.net = network.JsonLineSocket(s)
-            self._net_thread = threading.Thread(target=self._client_recv_loop, daemon=True)
-            self._net_thread.start()
+            self.transport = Transport()
+            # 밀려 있던 state는 가장 최신 것만 디코딩해서 한 번에 따라잡음
+            self.net = self.transport.connect(
+                self.host_ip, self.port, binary=self.wire == "binary", latest_only=("state",)
+            )
+            # 첫 메시지로 역할 요청 (host는 이걸 받아야 플레이어/관전자로 배정)
+            self.net.send({"type": "join", "role": "spectator" if self.spectator else "player"})
+            if self.use_udp and not self.spectator:
+                self._start_udp(0)
+                self.net.send({"type": "udp_hello", "port": self.udp.port})
 
         # BGM (onefile/onedir safe)
 
@@ -206,68 +201,44 @@ class Game:
         except Exception as e:
             print(f"이모티콘 로드 실패: {e}")
 
-
-    def _spawn_initial_items(self):
-        self.items = []
-        for _ in range(5):
-            pos = self.track.get_random_safe_point(self.width, self.height, 16, 16)
-            if pos:
-                self.items.append(Item(pos[0], pos[1]))
-
     # -----------------------------
     # Reset helpers
     # -----------------------------
-    def _reset_car_positions(self):
-        sp = self.track.spawn_points
-        angle = self.track.spawn_angle # 추가 - track.py에서 지정된 시작 각도 불러오기
-
-
-        self.car1.x, self.car1.y = sp[0]
-        self.car1.speed = 0
-        self.car1.angle = angle
-
-        self.car2.x, self.car2.y = sp[1]
-        self.car2.speed = 0
-        self.car2.angle = angle
-
-        # 아이템/부스트 상태 초기화
-        self.car1.has_item = False
-        self.car1.boost_timer = 0.0
-        self.car2.has_item = False
-        self.car2.boost_timer = 0.0
-
-        # emote 초기화(선택)
-        self.car1.emote_id = 0
-        self.car2.emote_id = 0
+    def _load_map(self, map_id: int):
+        self.current_map_id = map_id
+        self.sim.load_map(map_id)
+        if self.renderer is not None:
+            self.renderer.invalidate()
 
     def _reset_match_state(self):
-        self.cp_index1 = 0
-        self.cp_index2 = 0
-        self.winner = None
         self.finish_time = None
-        self.rematch_p1 = None
-        self.rematch_p2 = None
+        self.pending_emote = 0
+        if self.room is not None:
+            self.room.start_match()
+        self.votes = [None] * len(self.sim.cars)
 
-        # countdown
-        self.start_at = None
-        self.go_until = None
-        self.race_started = False
         if self.mode == "client":
-            # 클라는 time_offset 누적값을 유지해도 되지만, 맵 전환/재시작 때 흔들림 줄이려면 reset
-            self.time_offset = 0.0
+            # time_offset은 state마다 시계 동기화 결과로 다시 계산하므로 reset 불필요
+            self.input_history.clear()
+            self.input_sender.reset()
+            self._emote_out = None
+            self._predict_accum = 0.0
+            self._applied_state = None
+            self.snapshot_buffer.clear()
 
-        self._reset_car_positions()
+        # 맵 리셋 시 아이템도 초기화 (아이템 생성은 호스트/로컬만)
+        self.sim.reset_match(spawn_items=self.mode != "client")
 
-        # 맵 리셋 시 아이템도 초기화
-        if self.mode != "client":
-            self._spawn_initial_items()
+        # 맵 선택 화면 등에서 넘어오므로 첫 프레임은 전체 갱신
+        if self.renderer is not None:
+            self.renderer.invalidate()
 
     # -----------------------------
     # Main loop
     # -----------------------------
     def run(self):
         if self.mode == "host":
-            self._wait_for_client_and_bind()
+            self._lobby_screen()
 
         while self.running:
             self._select_map_screen()
@@ -290,21 +261,30 @@ class Game:
 
         self._cleanup_network()
 
-    def _wait_for_client_and_bind(self):
-        self._srv.settimeout(0.2)
-        while self.running and self.net is None:
-            self.handle_events()
+    def _lobby_screen(self):
+        # accept/핸드셰이크는 이벤트 루프가 처리, 여기서는 배정된 플레이어만 표시
+        # 최소 1명 접속 후 ENTER로 맵 선택으로 진행
+        while self.running:
+            for event in pygame.event.get():
+                if event.type == pygame.QUIT:
+                    self.running = False
+                elif event.type == pygame.KEYDOWN:
+                    if event.key == pygame.K_ESCAPE:
+                        self.running = False
+                    elif event.key == pygame.K_RETURN and any(p.connected for p in self.room.peers):
+                        return
+
+            self.room.poll()
+
             self.screen.fill((18, 18, 18))
-            msg = self.font.render("Waiting for client... (ESC to cancel)", True, (240, 240, 240))
-            self.screen.blit(msg, msg.get_rect(center=(self.width // 2, self.height // 2)))
+            n = self.room.num_players
+            title = "Waiting for players... (ESC to cancel)" if n < 2 else "Press ENTER to start (ESC to cancel)"
+            msg = render_text(self.font, title, (240, 240, 240))
+            self.screen.blit(msg, msg.get_rect(center=(self.width // 2, self.height // 2 - 40)))
+            count = render_text(self.font, f"Players: {n}/{self.room.max_players}", (100, 255, 100))
+            self.screen.blit(count, count.get_rect(center=(self.width // 2, self.height // 2)))
             pygame.display.flip()
-            try:
-                sock, _addr = self._srv.accept()
-                self.net = network.JsonLineSocket(sock)
-                self._net_thread = threading.Thread(target=self._host_recv_loop, daemon=True)
-                self._net_thread.start()
-            except Exception:
-                continue
+            self.clock.tick(30)
 
     # -----------------------------
     # Map select
@@ -325,21 +305,18 @@ class Game:
                 # local/host는 키로 선택
                 if self.mode in ("local", "host") and event.type == pygame.KEYDOWN:
                     if pygame.K_1 <= event.key <= pygame.K_5:
-                        self.current_map_id = event.key - pygame.K_1
-                        self.track.load_map(self.current_map_id)
-                        self._reset_car_positions()
+                        self._load_map(event.key - pygame.K_1)
                         selected = True
 
                 if event.type == pygame.KEYDOWN and event.key == pygame.K_ESCAPE:
                     self.running = False
                     return
 
-            # host는 선택 과정도 실시간 broadcast(미리보기 동기화)
-            if self.mode == "host" and self.net:
-                msg = {"type": "map_select", "map": self.current_map_id}
-                if selected:
-                    msg["start"] = True
-                self.net.send(msg)
+            self._poll_network()
+
+            # host는 선택 과정도 broadcast(미리보기 동기화, room이 바뀔 때 + keep-alive로만 전송)
+            if self.mode == "host":
+                self.room.send_map_select(self.current_map_id, start=selected)
 
             # client는 map_select 수신으로만 진행
             if self.mode == "client" and self.latest_state:
@@ -347,61 +324,88 @@ class Game:
                 if st.get("type") == "map_select":
                     server_map = int(st.get("map", 0))
                     if self.current_map_id != server_map:
-                        self.current_map_id = server_map
-                        self.track.load_map(server_map)
-                        self._reset_car_positions()
+                        self._load_map(server_map)
+                    if "players" in st:
+                        self.sim.set_num_players(int(st["players"]))
                     if st.get("start", False):
                         selected = True
 
             # draw
             self.screen.fill((30, 30, 30))
             if self.mode in ("local", "host"):
-                title = self.big_font.render("SELECT MAP (Press 1-5)", True, (255, 255, 0))
+                title = render_text(self.big_font, "SELECT MAP (Press 1-5)", (255, 255, 0))
                 self.screen.blit(title, title.get_rect(center=(self.width // 2, self.height // 2 - 40)))
-                sub = self.font.render(f"Current Preview: Map {self.current_map_id + 1}", True, (200, 200, 200))
+                sub = render_text(self.font, f"Current Preview: Map {self.current_map_id + 1}", (200, 200, 200))
                 self.screen.blit(sub, sub.get_rect(center=(self.width // 2, self.height // 2 + 20)))
             else:
-                title = self.big_font.render("Host is selecting map...", True, (200, 200, 200))
+                title = render_text(self.big_font, "Host is selecting map...", (200, 200, 200))
                 self.screen.blit(title, title.get_rect(center=(self.width // 2, self.height // 2)))
-                sub = self.font.render(f"Map {self.current_map_id + 1}", True, (100, 255, 100))
+                sub = render_text(self.font, f"Map {self.current_map_id + 1}", (100, 255, 100))
                 self.screen.blit(sub, sub.get_rect(center=(self.width // 2, self.height // 2 + 50)))
 
             pygame.display.flip()
             self.clock.tick(30)
 
     # -----------------------------
-    # Network recv loops
+    # Network inbox (게임 루프에서 호출)
     # -----------------------------
-    def _host_recv_loop(self):
-        while self.running and self.net is not None:
-            obj = self.net.recv()
-            if obj is None:
-                break
-            if obj.get("type") == "input":
-                self.remote_input = {
-                    "throttle": bool(obj.get("throttle")),
-                    "brake": bool(obj.get("brake")),
-                    "left": bool(obj.get("left")),
-                    "right": bool(obj.get("right")),
-                    "boost": bool(obj.get("boost")),
-                    "emote_req": int(obj.get("emote_req", 0)),
-                }
-            elif obj.get("type") == "rematch_vote":
-                self.rematch_p2 = obj.get("vote")
-
-    def _client_recv_loop(self):
-        while self.running and self.net is not None:
-            obj = self.net.recv()
-            if obj is None:
-                break
-            if obj.get("type") in ["state", "map_select"]:
-                self.latest_state = obj
-            elif obj.get("type") == "match_result":
-                action = obj.get("action")
-                if action == "restart":
-                    self.match_running = False
-                elif action == "quit":
-                    self.running = False
+    def _poll_network(self):
+        # 이벤트 루프 스레드가 쌓아 둔 메시지를 게임 스레드에서 처리 (공유 상태 동기화 불필요)
+        if self.room is not None:
+            self.room.poll()
+
+        if self.net is not None:
+            inbox = self.net.inbox
+            while inbox:
+                self._on_client_message(inbox.popleft())
+            if self.net.closed:
+                # host가 방을 닫았거나 연결이 끊김 → 메뉴로
+                print("DISCONNECTED FROM HOST")
+                self.running = False
+
+        if self.udp is not None:
+            inbox = self.udp.inbox
+            while inbox:
+                obj, _addr = inbox.popleft()
+                if obj.get("type") == "state":
+                    self._on_state_message(obj)
+
+    def _on_client_message(self, obj: dict):
+        if obj.get("type") == "state":
+            self._on_state_message(obj)
+        elif obj.get("type") == "map_select":
+            self.latest_state = obj
+        elif obj.get("type") == "udp_hello":
+            if self.udp is not None:
+                self.udp.set_peer((self.host_ip, obj.get("port", self.port)))
+                self.udp_ready = True
+        elif obj.get("type") == "welcome":
+            # 접속/퇴장으로 차 인덱스가 바뀔 수 있음
+            if not self.spectator:
+                self.player_index = int(obj.get("player", self.player_index))
+            self.input_history.clear()
+        elif obj.get("type") == "votes":
+            self.votes = list(obj.get("votes", []))
+        elif obj.get("type") == "reject":
+            print("JOIN REJECTED:", obj.get("reason"))
+            self.running = False
+        elif obj.get("type") == "match_result":
+            action = obj.get("action")
+            if action == "restart":
+                self.match_running = False
+            elif action == "quit":
+                self.running = False
+
+    def _on_state_message(self, obj: dict):
+        # baseline + delta로 전체 state 복원 (오래됐거나 복원 못 하면 버림)
+        st = self.snapshot_rx.receive(obj)
+        if st is not None:
+            self.latest_state = st
+            # latest_state는 프레임 사이 state를 덮어쓰므로 보간용으로 전부 버퍼링
+            self.snapshot_buffer.push(st)
+
+    def _start_udp(self, port: int):
+        self.udp = self.transport.open_udp(port)
 
     # -----------------------------
     # Events
@@ -417,8 +421,12 @@ class Game:
                 if event.key == pygame.K_ESCAPE:
                     self.running = False
 
+                # 관전자는 투표/이모트 없음
+                if self.spectator:
+                    continue
+
                 # winner 화면에서 5초 이후 Y/N 투표
-                if self.winner is not None:
+                if self.sim.winner is not None:
                     if self.finish_time and (time.time() - self.finish_time >= 5.0):
                         vote_val = None
                         if event.key == pygame.K_y:
@@ -427,10 +435,13 @@ class Game:
                             vote_val = False
 
                         if vote_val is not None:
-                            if self.mode in ("local", "host"):
-                                self.rematch_p1 = vote_val
+                            if self.mode == "host":
+                                self.room.set_vote(0, vote_val)
+                            elif self.mode == "local":
+                                self.votes[0] = vote_val
                             elif self.mode == "client":
-                                self.rematch_p2 = vote_val
+                                if self.player_index < len(self.votes):
+                                    self.votes[self.player_index] = vote_val
                                 if self.net:
                                     self.net.send({"type": "rematch_vote", "vote": vote_val})
 
@@ -449,400 +460,295 @@ class Game:
                         emote_val = 5
 
                     if emote_val > 0:
-                        if self.mode in ("local", "host"):
-                            self.car1.set_emote(emote_val)
-                        elif self.mode == "client":
-                            self.client_pending_emote = emote_val
+                        self.pending_emote = emote_val
 
     # -----------------------------
     # Update
     # -----------------------------
     def update(self, dt: float):
         keys = pygame.key.get_pressed()
+        self._poll_network()
 
         # 승리 시 투표 로직 (Host)
-        if self.winner is not None:
+        if self.sim.winner is not None:
             if self.finish_time is None:
                 self.finish_time = time.time()
 
             if self.mode == "host":
-                if self.rematch_p1 is not None and self.rematch_p2 is not None:
-                    if self.rematch_p1 and self.rematch_p2:
-                        if self.net:
-                            self.net.send({"type": "match_result", "action": "restart"})
+                action = self.room.vote_result()
+                if action is not None:
+                    self.room.finish_vote(action)
+                    if action == "restart":
                         self.match_running = False
                     else:
-                        if self.net:
-                            self.net.send({"type": "match_result", "action": "quit"})
                         self.running = False
             elif self.mode == "local":
                 # 로컬은 P2투표가 없으니, P1만으로 결정(편의)
-                if self.rematch_p1 is False:
+                if self.votes[0] is False:
                     self.running = False
-                elif self.rematch_p1 is True:
+                elif self.votes[0] is True:
                     self.match_running = False
             return
 
-        # 아이템 주기적 생성 (Host/Local)
-        if self.mode in ("local", "host"):
-            self.item_spawn_timer += dt
-            if self.item_spawn_timer >= self.ITEM_SPAWN_INTERVAL:
-                self.item_spawn_timer = 0.0
-                if len(self.items) < 5:
-                    pos = self.track.get_random_safe_point(self.width, self.height, 16, 16)
-                    if pos:
-                        self.items.append(Item(pos[0], pos[1]))
-
         # -----------------------------
-        # Countdown gate (host/local authoritative)
+        # Local / Host: 입력 수집 후 Simulation 고정 dt 진행
         # -----------------------------
         if self.mode in ("local", "host"):
-            now = time.monotonic()
-            if self.start_at is None:
-                self.start_at = now + self.countdown_total
-
-            if not self.race_started:
-                if now >= self.start_at:
-                    self.race_started = True
-                    self.go_until = now + self.show_go_time
-                else:
-                    # 출발 전에는 움직임 적용하지 않음
-                    if self.mode == "host" and self.net is not None:
-                        self._send_state_to_client(server_time=time.monotonic())
-                    return
-
-        # -----------------------------
-        # Local
-        # -----------------------------
-        if self.mode == "local":
-            self._move_with_sliding(self.car1, dt, keys, self.p1_keymap)
-            self._check_item_collision_host(self.car1)
-            if keys[self.p1_keymap["boost"]]:
-                self.car1.activate_boost()
-            self.cp_index1 = self._check_checkpoint(self.car1, self.cp_index1)
-
-            self._move_with_sliding(self.car2, dt, keys, self.p2_keymap)
-            self._check_item_collision_host(self.car2)
-            if keys[self.p2_keymap["boost"]]:
-                self.car2.activate_boost()
-            self.cp_index2 = self._check_checkpoint(self.car2, self.cp_index2)
-
-            if self.cp_index1 >= len(self.track.checkpoints):
-                self.winner = "P1"
-            elif self.cp_index2 >= len(self.track.checkpoints):
-                self.winner = "P2"
-            return
+            p1 = PlayerInput.from_keys(keys, self.p1_keymap, self.pending_emote)
+            if self.mode == "local":
+                p2 = PlayerInput.from_keys(keys, self.p2_keymap)
+                steps = self.sim.advance(dt, [p1, p2])
+            else:
+                # 원격 플레이어 입력 + state 전송은 room이 담당
+                steps = self.room.advance(dt, [p1])
 
-        # -----------------------------
-        # Host
-        # -----------------------------
-        if self.mode == "host":
-            # P2 emote req
-            p2_emote_req = int(self.remote_input.get("emote_req", 0))
-            if p2_emote_req > 0:
-                self.car2.set_emote(p2_emote_req)
-                self.remote_input["emote_req"] = 0
-
-            p1 = {
-                "throttle": keys[self.p1_keymap["throttle"]],
-                "brake": keys[self.p1_keymap["brake"]],
-                "left": keys[self.p1_keymap["left"]],
-                "right": keys[self.p1_keymap["right"]],
-                "boost": keys[self.p1_keymap["boost"]],
-            }
-            p2 = self.remote_input
-
-            # P1
-            self._move_with_sliding_control(self.car1, dt, p1)
-            self._check_item_collision_host(self.car1)
-            if p1.get("boost"):
-                self.car1.activate_boost()
-            self.cp_index1 = self._check_checkpoint(self.car1, self.cp_index1)
-
-            # P2
-            self._move_with_sliding_control(self.car2, dt, p2)
-            self._check_item_collision_host(self.car2)
-            if p2.get("boost"):
-                self.car2.activate_boost()
-            self.cp_index2 = self._check_checkpoint(self.car2, self.cp_index2)
-
-            if self.cp_index1 >= len(self.track.checkpoints):
-                self.winner = "P1"
-            elif self.cp_index2 >= len(self.track.checkpoints):
-                self.winner = "P2"
-
-            self._check_car_to_car_collision()
-
-
-            if self.net is not None:
-                self._send_state_to_client(server_time=time.monotonic())
+            if steps > 0:
+                # 1회성 입력(emote)은 적용됐으므로 소비
+                self.pending_emote = 0
             return
 
         # -----------------------------
         # Client
         # -----------------------------
         if self.mode == "client":
-            # 1) input send
-            if self.net is not None:
-                self.net.send(
-                    {
-                        "type": "input",
-                        "throttle": keys[self.p2_keymap["throttle"]],
-                        "brake": keys[self.p2_keymap["brake"]],
-                        "left": keys[self.p2_keymap["left"]],
-                        "right": keys[self.p2_keymap["right"]],
-                        "boost": keys[self.p2_keymap["boost"]],
-                        "emote_req": self.client_pending_emote,
-                    }
-                )
-                self.client_pending_emote = 0
-
-            # 2) state apply
+            # 1) 새 host state가 오면 반영 + 미확인 입력 재적용(reconciliation)
             st = self.latest_state
-            if st and st.get("type") == "state":
+            if st and st.get("type") == "state" and st is not self._applied_state:
+                self._applied_state = st
                 self._apply_server_state(st)
+                if self.sim.winner is not None:
+                    return
+
+            # 2) 고정 dt 틱마다 입력 전송 + 내 차 예측 (관전자는 보간만)
+            if self.spectator:
+                self._interpolate_remote_cars()
+                return
+            self._predict_accum += dt
+            ticks = 0
+            while self._predict_accum >= self.sim.dt and ticks < self.sim.MAX_STEPS_PER_ADVANCE:
+                self._predict_accum -= self.sim.dt
+                ticks += 1
+                self._client_tick(keys)
+            if ticks >= self.sim.MAX_STEPS_PER_ADVANCE:
+                self._predict_accum = min(self._predict_accum, self.sim.dt)
+
+            # 3) 원격 차량은 스냅샷 보간 위치로 렌더
+            self._interpolate_remote_cars()
             return
 
-    def _send_state_to_client(self, server_time: float):
-        item_data = [{"x": i.rect.x, "y": i.rect.y} for i in self.items]
-        self.net.send(
-            {
-                "type": "state",
-                "server_time": server_time,
-                "start_at": self.start_at,
-                "go_until": self.go_until,
-                "race_started": self.race_started,
-                "map": self.current_map_id,
-                "items": item_data,
-                # car state (+ emote, has_item)
-                "car1": {
-                    "x": self.car1.x,
-                    "y": self.car1.y,
-                    "a": self.car1.angle,
-                    "s": self.car1.speed,
-                    "e": self.car1.emote_id,
-                    "hi": self.car1.has_item,
-                    "bt": float(getattr(self.car1, "boost_timer", 0.0)),
-                },
-                "car2": {
-                    "x": self.car2.x,
-                    "y": self.car2.y,
-                    "a": self.car2.angle,
-                    "s": self.car2.speed,
-                    "e": self.car2.emote_id,
-                    "hi": self.car2.has_item,
-                    "bt": float(getattr(self.car2, "boost_timer", 0.0)),
-                },
-                "cp1": self.cp_index1,
-                "cp2": self.cp_index2,
-                "winner": self.winner,
-            }
-        )
+    def _interpolate_remote_cars(self):
+        cars = self.snapshot_buffer.sample_cars(self._host_time_now() - self.INTERP_DELAY)
+        if not cars:
+            return
+        for i, (car, c) in enumerate(zip(self.sim.cars, cars)):
+            if i == self.player_index:
+                continue
+            car.x, car.y, car.angle = c["x"], c["y"], c["a"]
+
+    def _client_tick(self, keys):
+        self.input_seq += 1
+        if self.pending_emote:
+            self._emote_out = (self.pending_emote, self.input_seq)
+            self.pending_emote = 0
+        emote = self._emote_out[0] if self._emote_out else 0
+        inp = PlayerInput.from_keys(keys, self.p2_keymap, emote)
+
+        if self.net is not None and self.input_sender.should_send(inp, self.input_seq):
+            msg = {"type": "input"}
+            msg.update(inp.to_dict())
+            if self.snapshot_rx.last_seq is not None:
+                msg["ack"] = self.snapshot_rx.last_seq
+            msg["seq"] = self.input_seq
+            msg["n"] = self.input_sender.count
+            if self._emote_out:
+                msg["emote_seq"] = self._emote_out[1]
+            self._send_realtime(msg)
+
+        # 출발 후에만 예측 (카운트다운 중에는 host도 움직이지 않음)
+        if self.sim.race_started and self.sim.winner is None:
+            self.input_history.push(self.input_seq, inp)
+            self._predict_own_car(inp)
+
+    def _predict_own_car(self, inp: PlayerInput):
+        car = self.sim.cars[self.player_index]
+        self.sim.move_car(car, self.sim.dt, inp)
+        if inp.boost:
+            car.activate_boost()
+
+    def _send_realtime(self, msg: dict):
+        # state/input: UDP가 준비됐으면 UDP, 아니면 TCP
+        if self.udp_ready and self.udp.send(msg):
+            return
+        self.net.send(msg)
 
     def _apply_server_state(self, st: dict):
-        # time offset smoothing
+        # host 시각 환산: server_time이 host 시계로 언제였는지(clock) + ping/pong으로 맞춘 시계 offset
+        # (도착 시각 기준이 아니므로 한 방향 지연/큐 지연/지터가 섞이지 않음)
         try:
             srv_now = float(st.get("server_time", time.monotonic()))
         except Exception:
             srv_now = time.monotonic()
-        local_now = time.monotonic()
-        new_offset = srv_now - local_now
-        self.time_offset = self.time_offset * 0.8 + new_offset * 0.2
-
-        # countdown sync
-        if "start_at" in st:
-            self.start_at = st.get("start_at")
-        if "go_until" in st:
-            self.go_until = st.get("go_until")
-        if "race_started" in st:
-            self.race_started = bool(st.get("race_started"))
+        clock = self.net.clock if self.net is not None else None
+        if clock is not None and clock.synced and st.get("clock") is not None:
+            self.time_offset = srv_now - float(st["clock"]) + clock.offset
+        else:
+            # 동기화 전: 도착 시각 기준 (편도 지연만큼 늦음)
+            self.time_offset = srv_now - time.monotonic()
 
         # map sync
         server_map = int(st.get("map", 0))
         if self.current_map_id != server_map:
-            self.current_map_id = server_map
-            self.track.load_map(server_map)
-            self._reset_car_positions()
-
-        # checkpoints / winner
-        self.cp_index1 = int(st.get("cp1", self.cp_index1))
-        self.cp_index2 = int(st.get("cp2", self.cp_index2))
+            self._load_map(server_map)
+        cars = st.get("cars")
+        if cars is not None and len(cars) != len(self.sim.cars):
+            self.sim.set_num_players(len(cars))
 
+        # winner
         new_winner = st.get("winner", None)
-        if new_winner and not self.winner:
+        if new_winner and not self.sim.winner:
             self.finish_time = time.time()
-        self.winner = new_winner
-
-        # items sync
-        server_items = st.get("items", [])
-        self.items = [Item(d["x"], d["y"]) for d in server_items]
-
-        # cars
-        c1 = st.get("car1", {})
-        c2 = st.get("car2", {})
-
-        self.car1.x = float(c1.get("x", self.car1.x))
-        self.car1.y = float(c1.get("y", self.car1.y))
-        self.car1.angle = float(c1.get("a", self.car1.angle))
-        self.car1.speed = float(c1.get("s", self.car1.speed))
-        self.car1.has_item = bool(c1.get("hi", self.car1.has_item))
-        self.car1.boost_timer = float(c1.get("bt", getattr(self.car1, "boost_timer", 0.0)))
-        self.car1.emote_id = int(c1.get("e", 0))
-        if self.car1.emote_id > 0:
-            self.car1.emote_end_time = time.time() + 1.0
-
-        self.car2.x = float(c2.get("x", self.car2.x))
-        self.car2.y = float(c2.get("y", self.car2.y))
-        self.car2.angle = float(c2.get("a", self.car2.angle))
-        self.car2.speed = float(c2.get("s", self.car2.speed))
-        self.car2.has_item = bool(c2.get("hi", self.car2.has_item))
-        self.car2.boost_timer = float(c2.get("bt", getattr(self.car2, "boost_timer", 0.0)))
-        self.car2.emote_id = int(c2.get("e", 0))
-        if self.car2.emote_id > 0:
-            self.car2.emote_end_time = time.time() + 1.0
 
-    # -----------------------------
-    # Collision / movement helpers
-    # -----------------------------
-    def _check_item_collision_host(self, car: Car):
-        if not car.has_item:
-            car_rect = car.get_aabb_rect()
-            for item in self.items[:]:
-                if car_rect.colliderect(item.rect):
-                    self.items.remove(item)
-                    car.has_item = True
-                    break
-
-    def _move_with_sliding_control(self, car: Car, dt: float, control: dict):
-        old_x, old_y = car.x, car.y
-        car.update_control(
-            dt,
-            control.get("throttle", False),
-            control.get("brake", False),
-            control.get("left", False),
-            control.get("right", False),
-        )
-        self._sliding_collision(car, old_x, old_y)
-
-    def _move_with_sliding(self, car: Car, dt: float, keys, keymap: dict):
-        old_x, old_y = car.x, car.y
-        car.update(dt, keys, keymap)
-        self._sliding_collision(car, old_x, old_y)
-
-    def _sliding_collision(self, car: Car, old_x: float, old_y: float):
-        dx, dy = car.x - old_x, car.y - old_y
-        car.x, car.y = old_x, old_y
-
-        car.x = old_x + dx
-        if self.track.collides_with_walls(car.get_aabb_rect()):
-            car.x = old_x
-
-        car.y = old_y + dy
-        if self.track.collides_with_walls(car.get_aabb_rect()):
-            car.y = old_y
-
-    def _check_checkpoint(self, car: Car, cp_index: int) -> int:
-        if cp_index >= len(self.track.checkpoints):
-            return cp_index
-        target = self.track.checkpoints[cp_index]
-        if car.get_aabb_rect().colliderect(target):
-            return cp_index + 1
-        return cp_index
+        self.sim.apply_snapshot(st)
+
+        # reconciliation: 내 차를 host 기준 위치로 되돌린 뒤, host가 아직 처리 안 한 입력 재적용
+        acks = st.get("acks") or []
+        if self.player_index is not None and self.player_index < len(acks):
+            self.input_history.ack(acks[self.player_index])
+            # host ack는 받은 입력을 계속 적용한 틱만큼 앞당겨지므로, emote는 내 차에 실제로 떴는지도 확인
+            if self._emote_out and acks[self.player_index] >= self._emote_out[1]:
+                cars = st.get("cars") or []
+                if self.player_index < len(cars) and cars[self.player_index].get("e") == self._emote_out[0]:
+                    self._emote_out = None
+        if self.sim.race_started and self.sim.winner is None:
+            for _seq, inp in self.input_history.pending():
+                self._predict_own_car(inp)
 
     # -----------------------------
     # Draw
     # -----------------------------
     def draw(self):
-        # 배경(트랙 draw에서 fill하지 않도록 통합했기 때문에 game이 fill 담당)
-        self.screen.fill((40, 90, 40))
-        pygame.draw.rect(self.screen, (30, 30, 30), self.screen.get_rect(), 6)
-
-        self.track.draw(self.screen)
+        # 더티 렉트 모드: 지난 프레임 영역만 정적 레이어로 복원 후 바뀐 영역만 update
+        r = self.renderer
+        if r is not None:
+            r.begin(self.track.get_static_layer((self.width, self.height)))
+        else:
+            # 배경 + 테두리 + 트랙(벽/체크포인트)은 캐시된 정적 레이어 한 번 blit
+            self.track.draw_static(self.screen)
 
         # items
-        for item in self.items:
-            item.draw(self.screen)
+        for item in self.sim.items:
+            rect = item.draw(self.screen)
+            if r is not None:
+                r.add(rect)
 
         # cars + emotes
-        self.car1.draw(self.screen, self.emote_imgs)
-        self.car2.draw(self.screen, self.emote_imgs)
+        for car in self.sim.cars:
+            rect = car.draw(self.screen, self.emote_imgs)
+            if r is not None:
+                r.add(rect)
 
         if self.show_hud:
-            self._draw_hud()
+            for rect in self._draw_hud():
+                if r is not None:
+                    r.add(rect)
 
         # countdown overlay (winner 없을 때만)
-        if self.winner is None:
-            self._draw_countdown_overlay()
+        if self.sim.winner is None:
+            if self._draw_countdown_overlay() and r is not None:
+                r.invalidate()
 
         # winner / rematch UI
-        if self.winner and self.finish_time:
+        if self.sim.winner and self.finish_time:
             self._draw_result_overlay()
+            if r is not None:
+                r.invalidate()
 
-        pygame.display.flip()
-
-    def _draw_hud(self):
-        p1_state = "BOOST!" if getattr(self.car1, "boost_timer", 0) > 0 else ("ITEM" if self.car1.has_item else "")
-        p2_state = "BOOST!" if getattr(self.car2, "boost_timer", 0) > 0 else ("ITEM" if self.car2.has_item else "")
+        if r is not None:
+            r.present()
+        else:
+            pygame.display.flip()
 
-        lines = [
-            f"FPS: {self.clock.get_fps():.1f}",
-            f"P1 CP: {self.cp_index1}/{len(self.track.checkpoints)} | {p1_state}",
-            f"P2 CP: {self.cp_index2}/{len(self.track.checkpoints)} | {p2_state}",
-        ]
+    def _draw_hud(self) -> list[pygame.Rect]:
+        lines = [f"FPS: {self.clock.get_fps():.1f}"]
+        for i, car in enumerate(self.sim.cars):
+            state = "BOOST!" if car.boost_timer > 0 else ("ITEM" if car.has_item else "")
+            lines.append(f"P{i + 1} CP: {self.sim.cp_indices[i]}/{len(self.track.checkpoints)} | {state}")
+        stats = None
+        if self.room is not None:
+            stats = self.room.queue_stats()
+        elif self.net is not None:
+            stats = self.net.queue_stats()
+        if self.spectator:
+            lines.append("SPECTATING")
+        if self.net is not None and self.net.clock.synced:
+            clock = self.net.clock
+            lines.append(f"RTT: {clock.rtt * 1000:.1f} ms (min {clock.min_rtt * 1000:.1f}) | clock offset {clock.offset * 1000:+.1f} ms")
+        if stats is not None:
+            lines.append(f"NET queue: {stats['depth']} ({stats['bytes']} B) | max {stats['max_depth']} | coalesced {stats['coalesced']}")
+        if self.room is not None and self.room.peers:
+            lines.append("STATE Hz: " + " ".join(f"{r:.0f}" for r in self.room.state_rates()))
+        rects = []
         y = 8
         for line in lines:
-            surf = self.font.render(line, True, (220, 220, 220))
-            self.screen.blit(surf, (10, y))
+            surf = render_text(self.font, line, (220, 220, 220))
+            rects.append(self.screen.blit(surf, (10, y)))
             y += 20
+        return rects
 
     def _draw_result_overlay(self):
-        overlay = pygame.Surface((self.width, self.height))
-        overlay.set_alpha(150)
-        overlay.fill((0, 0, 0))
-        self.screen.blit(overlay, (0, 0))
-
-        if self.winner == "P1":
-            first, second = "P1", "P2"
-            color1, color2 = (255, 255, 0), (200, 200, 200)
-        else:
-            first, second = "P2", "P1"
-            color1, color2 = (255, 255, 0), (200, 200, 200)
+        self.screen.blit(get_overlay((self.width, self.height), (0, 0, 0), 150), (0, 0))
 
-        txt_1st = self.rank_font.render(f"1st Player: {first}", True, color1)
-        txt_2nd = self.big_font.render(f"2nd Player: {second}", True, color2)
+        # 순위: 승자 먼저, 나머지는 체크포인트 진행도 순
+        n = len(self.sim.cars)
+        winner = int(self.sim.winner[1:]) - 1 if self.sim.winner else 0
+        order = sorted(range(n), key=lambda i: (i != winner, -self.sim.cp_indices[i], i))
 
+        txt_1st = render_text(self.rank_font, f"1st Player: P{order[0] + 1}", (255, 255, 0))
         self.screen.blit(txt_1st, txt_1st.get_rect(center=(self.width // 2, self.height // 2 - 80)))
-        self.screen.blit(txt_2nd, txt_2nd.get_rect(center=(self.width // 2, self.height // 2)))
+        if n == 2:
+            txt_2nd = render_text(self.big_font, f"2nd Player: P{order[1] + 1}", (200, 200, 200))
+            self.screen.blit(txt_2nd, txt_2nd.get_rect(center=(self.width // 2, self.height // 2)))
+        elif n > 2:
+            suffix = {2: "2nd", 3: "3rd"}
+            rest = "   ".join(f"{suffix.get(r + 1, f'{r + 1}th')}: P{i + 1}" for r, i in enumerate(order[1:], 1))
+            txt_rest = render_text(self.font, rest, (200, 200, 200))
+            self.screen.blit(txt_rest, txt_rest.get_rect(center=(self.width // 2, self.height // 2)))
 
         elapsed = time.time() - self.finish_time
         if elapsed < 5.0:
             remain = int(6 - elapsed)
-            count_msg = self.font.render(f"Next screen in {remain}...", True, (150, 150, 150))
+            count_msg = render_text(self.font, f"Next screen in {remain}...", (150, 150, 150))
             self.screen.blit(count_msg, count_msg.get_rect(center=(self.width // 2, self.height // 2 + 100)))
         else:
-            q_msg = self.big_font.render("Do you want to do it again? (Y / N)", True, (255, 255, 255))
+            q_msg = render_text(self.big_font, "Do you want to do it again? (Y / N)", (255, 255, 255))
             self.screen.blit(q_msg, q_msg.get_rect(center=(self.width // 2, self.height // 2 + 100)))
 
             def get_vote_str(val):
                 return "READY" if val is True else ("NO" if val is False else "Waiting...")
 
-            p1_state = get_vote_str(self.rematch_p1)
-            p2_state = get_vote_str(self.rematch_p2)
-
-            status_msg = self.font.render(f"P1: {p1_state}   |   P2: {p2_state}", True, (200, 200, 200))
-            self.screen.blit(status_msg, status_msg.get_rect(center=(self.width // 2, self.height // 2 + 150)))
+            # 한 줄에 4명씩
+            votes = self.room.votes if self.room is not None else self.votes
+            for row in range(0, len(votes), 4):
+                status = "   |   ".join(
+                    f"P{i + 1}: {get_vote_str(v)}" for i, v in enumerate(votes[row:row + 4], row)
+                )
+                status_msg = render_text(self.font, status, (200, 200, 200))
+                y = self.height // 2 + 150 + 24 * (row // 4)
+                self.screen.blit(status_msg, status_msg.get_rect(center=(self.width // 2, y)))
 
-    def _draw_countdown_overlay(self):
+    def _draw_countdown_overlay(self) -> bool:
+        # 무언가 그렸으면 True (더티 렉트 모드에서 전체 갱신 판단용)
         # GO 표시 (race_started 이후, go_until까지)
-        if self.race_started:
-            if self.go_until is not None and self._host_time_now() < float(self.go_until):
-                msg = self.font.render("GO!", True, (0, 255, 0))
+        if self.sim.race_started:
+            if self.sim.go_until is not None and self._host_time_now() < float(self.sim.go_until):
+                msg = render_text(self.font, "GO!", (0, 255, 0))
                 self.screen.blit(msg, msg.get_rect(center=(self.width // 2, 140)))
-            return
+                return True
+            return False
 
         left = self._countdown_left()
         if left is None:
-            return
+            return False
 
         if left <= 0:
             sec = 1
@@ -850,8 +756,8 @@ class Game:
             sec = int(left) + 1
             sec = max(1, min(3, sec))
 
-        big = pygame.font.SysFont(None, 90)
-        num = big.render(str(sec), True, (255, 255, 255))
+        big = get_font(None, 90)
+        num = render_text(big, str(sec), (255, 255, 255))
         self.screen.blit(num, num.get_rect(center=(self.width // 2, 140)))
 
         # 신호등
@@ -874,73 +780,32 @@ class Game:
         pygame.draw.circle(self.screen, yellow, (cx, cy), radius)
         pygame.draw.circle(self.screen, green, (cx + gap, cy), radius)
 
-        small = pygame.font.SysFont(None, 26)
-        tip = small.render("Get ready...", True, (220, 220, 220))
+        small = get_font(None, 26)
+        tip = render_text(small, "Get ready...", (220, 220, 220))
         self.screen.blit(tip, tip.get_rect(center=(self.width // 2, 300)))
-
-        # 추가 - 충돌 처리 함수
-    def _check_car_to_car_collision(self):
-        # 두 차량의 히트박스(rect) 가져오기
-        rect1 = self.car1.get_aabb_rect()
-        rect2 = self.car2.get_aabb_rect()
-
-        # 충돌 감지
-        if rect1.colliderect(rect2):
-            # 밀어내기 전 위치를 저장
-            c1_old_x, c1_old_y = self.car1.x, self.car1.y
-            c2_old_x, c2_old_y = self.car2.x, self.car2.y
-            
-            # 두 차량의 중심점 사이 거리 계산
-            dx = self.car1.x - self.car2.x
-            dy = self.car1.y - self.car2.y
-
-            # 두 차량 사이 거리가 너무 가까우면 강제로 값을 주기(0으로 나누기 방지)
-            if dx == 0 and dy == 0:
-                dx = 1.0
-            
-            # 밀어낼 힘의 크기
-            push_power = 5.0
-
-            # 방향 정규화
-            dist = (dx ** 2 + dy ** 2) ** 0.5
-            if dist > 0:
-                dx /= dist
-                dy /= dist
-            
-            # Car1은 밀려나고, Car2는 반대로 밀려남
-            self.car1.x += dx * push_power
-            self.car1.y += dy * push_power
-            self.car2.x -= dx * push_power
-            self.car2.y -= dy * push_power
-
-            # Car 1이 벽으로 밀려났다면? -> 원래 위치로 복귀
-            if self.track.collides_with_walls(self.car1.get_aabb_rect()):
-                self.car1.x, self.car1.y = c1_old_x, c1_old_y
-
-            # Car 2가 벽으로 밀려났다면? -> 원래 위치로 복귀
-            if self.track.collides_with_walls(self.car2.get_aabb_rect()):
-                self.car2.x, self.car2.y = c2_old_x, c2_old_y
-
-            # 속도 감소
-            self.car1.speed *= 0.5
-            self.car2.speed *= 0.5
-    
+        return True
 
     def _host_time_now(self):
+        # host/local은 시뮬레이션 시계 그대로
+        if self.mode != "client":
+            return self.sim.time
         # client는 local monotonic + offset => host time으로 환산
         return time.monotonic() + float(self.time_offset)
 
     def _countdown_left(self):
-        if self.start_at is None:
+        if self.sim.start_at is None:
             return None
-        return float(self.start_at) - self._host_time_now()
+        return float(self.sim.start_at) - self._host_time_now()
 
     # -----------------------------
     # Cleanup
     # -----------------------------
     def _cleanup_network(self):
+        if self.transport is None:
+            return
         try:
-            self._broadcast_stop.set()
+            if self.room is not None:
+                self.room.close()
         except Exception:
             pass
         try:
@@ -949,7 +814,8 @@ class Game:
         except Exception:
             pass
         try:
-            if getattr(self, "_srv", None):
-                self._srv.close()
+            if getattr(self, "udp", None):
+                self.udp.close()
         except Exception:
             pass
+        self.transport.stop()
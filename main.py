@@ -4,11 +4,18 @@ import time
 
 from game import Game
 import network
+from transport import Transport
+from fonts import get_font, render_text
 from ui import Button, TextInput, draw_title, draw_label
 from resource import resource_path
 
 WIDTH, HEIGHT = 900, 600
 
+# True면 바뀐 영역만 화면에 반영 (저사양 PC / 소프트웨어 렌더링 키오스크용)
+# - 게임: 차/아이템/이모트/HUD 영역만 display.update(rects)
+# - 메뉴: 입력 이벤트가 있을 때만 다시 그림
+DIRTY_RECTS = False
+
 
 def run_host(screen, clock, room_name, room_id, port):
     # Host 모드로 게임 실행 (Game.run()이 끝나면 메뉴로 돌아옴)
@@ -18,16 +25,20 @@ def run_host(screen, clock, room_name, room_id, port):
         port=port,
         room_name=room_name,
         room_id=room_id,
+        dirty_rects=DIRTY_RECTS,
     )
     game.run()
 
 
-def run_client(screen, clock, host_ip, port):
+def run_client(screen, clock, host_ip, port, spectator=False):
+    # spectator=True: 차 없이 관전만 (입력/투표 없음)
     game = Game(
         screen, clock,
         mode="client",
         host_ip=host_ip,
         port=port,
+        dirty_rects=DIRTY_RECTS,
+        spectator=spectator,
     )
     game.run()
 
@@ -52,9 +63,9 @@ def main():
         bg_menu = None
 
 
-    font_title = pygame.font.SysFont(None, 40)
-    font = pygame.font.SysFont(None, 26)
-    font_small = pygame.font.SysFont(None, 22)
+    font_title = get_font(None, 40)
+    font = get_font(None, 26)
+    font_small = get_font(None, 22)
 
     state = "menu"   # menu / create / join / settings
     running = True
@@ -80,12 +91,14 @@ def main():
     last_discover_time = 0.0
     rooms = []  # list of dict
     room_buttons = []
-    
+
+    # 방 검색: join 화면에 있는 동안만 백그라운드 수신 (목록은 바뀔 때만 다시 구성)
+    discovery = None  # 메뉴 전용 Transport (처음 join 화면에 들어갈 때 생성)
+    browser = None
+
     def refresh_rooms():
         nonlocal rooms, room_buttons
-        found = network.discover_rooms(listen_seconds=1.2)
-        rooms = list(found.values())
-        rooms.sort(key=lambda r: (r.get("room_name", ""), r.get("ip", "")))
+        rooms = browser.table.sorted_rooms() if browser is not None else []
 
         room_buttons = []
         y = 120
@@ -94,7 +107,13 @@ def main():
             ip = r.get("ip", "?")
             port = r.get("port", "?")
             text = f"{name}  ({ip}:{port})"
-            room_buttons.append((r, Button((60, y, 780, 42), text, font_small)))
+            # 질의 응답에 실린 실시간 상태 (beacon만 보내는 구버전 host면 생략)
+            if "players" in r:
+                text += f"  {r['players']}/{r.get('max_players', '?')}"
+                text += f"  Map {int(r.get('map', 0)) + 1}  {'RACING' if r.get('in_race') else 'LOBBY'}"
+            room_buttons.append(
+                (r, Button((60, y, 650, 42), text, font_small), Button((720, y, 120, 42), "Watch", font_small))
+            )
             y += 50
     # def refresh_rooms():
     #     nonlocal rooms, room_buttons, last_discover_time
@@ -117,9 +136,11 @@ def main():
     # 초기 진입 시 목록 한번
     # (join 화면 들어갈 때 refresh_rooms() 호출)
 
+    redraw = True
     while running:
         dt = clock.tick(60) / 1000.0
         for event in pygame.event.get():
+            redraw = True
             if event.type == pygame.QUIT:
                 running = False
 
@@ -135,7 +156,6 @@ def main():
                     state = "create"
                 if btn_join.handle_event(event):
                     state = "join"
-                    refresh_rooms()
                 if btn_settings.handle_event(event):
                     state = "settings"
                 if btn_quit.handle_event(event):
@@ -164,15 +184,20 @@ def main():
             elif state == "join":
                 if btn_back2.handle_event(event):
                     state = "menu"
-                if btn_refresh.handle_event(event):
+                if btn_refresh.handle_event(event) and browser is not None:
+                    browser.refresh()
                     refresh_rooms()
 
                 # 방 버튼 클릭
-                for r, b in room_buttons:
-                    if b.handle_event(event):
+                for r, b, b_watch in room_buttons:
+                    join = b.handle_event(event)
+                    watch = b_watch.handle_event(event)
+                    if join or watch:
                         host_ip = r.get("ip")
                         port = int(r.get("port"))
-                        run_client(screen, clock, host_ip, port)
+                        browser.close()
+                        browser = None
+                        run_client(screen, clock, host_ip, port, spectator=watch)
                         state = "menu"
                         break
 
@@ -180,7 +205,26 @@ def main():
                 # 일단 껍데기만: 뒤로는 ESC 또는 상태 변경
                 pass
 
+        # -------- 방 검색 --------
+        if state == "join":
+            if browser is None:
+                if discovery is None:
+                    discovery = Transport()
+                browser = discovery.browse_rooms()
+                refresh_rooms()
+            if browser.poll():
+                refresh_rooms()
+                redraw = True
+        elif browser is not None:
+            browser.close()
+            browser = None
+
         # -------- 화면 그리기 --------
+        # 더티 렉트 모드: 메뉴는 정적이므로 이벤트가 없던 프레임은 건너뜀
+        if DIRTY_RECTS and not redraw:
+            continue
+        redraw = False
+
         if state == "menu" and bg_menu is not None:
             screen.blit(bg_menu, (0, 0))      # ✅ 배경이미지 먼저
         else:
@@ -208,32 +252,37 @@ def main():
             btn_back1.draw(screen)
 
             # 참고: host IP 보여주기
-            ip = network.get_local_ip()
-            info = font_small.render(f"My IP: {ip}  (Automatically visible in room list on the same Wi-Fi)", True, (180, 180, 180))
+            ip = network.interfaces.local_ip()  # 캐시된 값 (매 프레임 소켓을 만들지 않음)
+            info = render_text(font_small, f"My IP: {ip}  (Automatically visible in room list on the same Wi-Fi)", (180, 180, 180))
             screen.blit(info, (30, 520))
 
         elif state == "join":
             draw_title(screen, font_title, "Join Game Room")
-            info = font_small.render("Searching for rooms on LAN... (If not visible, check AP isolation / firewall)", True, (180, 180, 180))
+            info = render_text(font_small, "Searching for rooms on LAN... (If not visible, check AP isolation / firewall)", (180, 180, 180))
             screen.blit(info, (30, 70))
 
             if not rooms:
-                empty = font.render("No rooms found. Click [Refresh] to scan again.", True, (220, 220, 220))
+                empty = render_text(font, "No rooms found yet. Rooms appear here as soon as they are announced.", (220, 220, 220))
                 screen.blit(empty, (60, 140))
 
-            for r, b in room_buttons:
+            for r, b, b_watch in room_buttons:
                 b.draw(screen)
+                b_watch.draw(screen)
 
             btn_refresh.draw(screen)
             btn_back2.draw(screen)
 
         elif state == "settings":
             draw_title(screen, font_title, "Settings")
-            t = font.render("Settings will be added in the next step. (Press ESC to go back)", True, (220, 220, 220))
+            t = render_text(font, "Settings will be added in the next step. (Press ESC to go back)", (220, 220, 220))
             screen.blit(t, (30, 120))
 
         pygame.display.flip()
 
+    if browser is not None:
+        browser.close()
+    if discovery is not None:
+        discovery.stop()
     pygame.quit()
 
 
@@ -0,0 +1,368 @@
+# netcode.py
+"""
+네트워크 동기화 보조 로직 (소켓과 무관한 순수 로직):
+- SnapshotHistory: host가 보낸 state를 seq별로 보관, client가 ack한 baseline 기준 delta 생성
+- SnapshotReceiver: client가 baseline + delta로 전체 state 복원, 마지막으로 복원한 seq를 ack
+- InputHistory: client 예측용 미확인 입력 링버퍼 (host ack 이후 입력만 재적용)
+- SnapshotBuffer: server_time 기준 스냅샷 버퍼, 원격 차량을 고정 지연 시점으로 보간/짧게 외삽
+- ClockSync: ping/pong(NTP 방식)으로 host 시계와의 offset / RTT 추정 (최소 RTT 샘플 사용)
+- InputSender: client input을 바뀔 때(+연속 redundancy틱)와 keep-alive 주기에만 전송
+- SendRateController: host가 peer별 state 전송 주기를 RTT / 손실 / 송신 큐 적체에 맞춰 조절
+"""
+import math
+from collections import deque
+
+# delta 비교에서 제외하는 키 (메시지 메타데이터)
+_META_KEYS = ("type", "seq", "base")
+
+# 입력이 안 바뀌어도 client가 input을 보내는 최대 간격 (틱, 60Hz 기준 0.25초)
+# host는 마지막 input 이후 이 틱 수까지만 같은 입력이 이어진다고 보고 ack를 앞당김
+INPUT_KEEPALIVE_TICKS = 15
+
+
+def diff_state(base: dict, cur: dict) -> dict:
+    """
+    cur 중 base와 달라진 필드만 남긴 dict.
+    - cars는 차량별로 바뀐 필드만 (안 바뀐 차는 빈 dict)
+    - 그 외(items 포함)는 값이 바뀐 경우에만 통째로
+    """
+    delta = {}
+    for key, value in cur.items():
+        if key in _META_KEYS:
+            continue
+        old = base.get(key)
+        if key == "cars" and isinstance(old, list) and len(old) == len(value):
+            cars = [{k: v for k, v in c.items() if o.get(k) != v} for o, c in zip(old, value)]
+            if any(cars):
+                delta["cars"] = cars
+        elif key not in base or old != value:
+            delta[key] = value
+    return delta
+
+
+def apply_delta(base: dict, delta: dict) -> dict:
+    """base에 delta를 덮어쓴 새 전체 state (base는 변경하지 않음)"""
+    state = dict(base)
+    for key, value in delta.items():
+        if key in _META_KEYS:
+            continue
+        old = base.get(key)
+        if key == "cars" and isinstance(old, list) and len(old) == len(value):
+            state["cars"] = [dict(o, **c) for o, c in zip(old, value)]
+        else:
+            state[key] = value
+    return state
+
+
+class SnapshotHistory:
+    """
+    Host: 틱마다 push(state)로 스냅샷 등록 → message_for(ack)로 전송용 메시지 생성
+    - ack한 baseline이 history에 있으면 delta ({"seq", "base", 바뀐 필드})
+    - ack가 없거나 너무 오래됐거나 keyframe 주기면 전체 state ({"seq", 전체 필드})
+    """
+
+    def __init__(self, size: int = 64, keyframe_interval: int = 60):
+        self.size = size
+        self.keyframe_interval = keyframe_interval
+        self.seq = 0
+        self._states: dict[int, dict] = {}
+
+    def push(self, state: dict) -> int:
+        self.seq += 1
+        self._states[self.seq] = state
+        self._states.pop(self.seq - self.size, None)
+        return self.seq
+
+    def is_keyframe(self) -> bool:
+        return self.seq % self.keyframe_interval == 0
+
+    def baseline_for(self, ack: int | None) -> int | None:
+        """ack 기준으로 실제 delta를 만들 baseline seq (keyframe이면 None)"""
+        if ack is None or ack not in self._states or self.is_keyframe():
+            return None
+        return ack
+
+    def message_for(self, ack: int | None) -> dict:
+        """같은 baseline_for() 값이면 같은 메시지 (여러 client에 한 번만 인코딩해서 전송 가능)"""
+        cur = self._states[self.seq]
+        base = self.baseline_for(ack)
+        if base is None:
+            msg = dict(cur)
+        else:
+            msg = diff_state(self._states[base], cur)
+            msg["base"] = base
+        msg["type"] = "state"
+        msg["seq"] = self.seq
+        return msg
+
+
+class SnapshotReceiver:
+    """
+    Client: state 메시지를 받아 전체 state로 복원
+    - "base"가 없으면 keyframe, 있으면 보관 중인 baseline에 delta 적용
+    - baseline을 모르거나 이미 받은 것보다 오래된 seq면 None (버림)
+    """
+
+    def __init__(self, size: int = 64):
+        self.size = size
+        self.last_seq: int | None = None
+        self._states: dict[int, dict] = {}
+
+    def reset(self):
+        self.last_seq = None
+        self._states.clear()
+
+    def receive(self, msg: dict) -> dict | None:
+        seq = msg.get("seq")
+        if seq is None:
+            # seq 없는 구버전 state는 그대로 사용
+            return msg
+        if self.last_seq is not None and seq <= self.last_seq:
+            return None
+
+        if "base" in msg:
+            base = self._states.get(msg["base"])
+            if base is None:
+                return None
+            state = apply_delta(base, msg)
+        else:
+            state = {k: v for k, v in msg.items() if k not in _META_KEYS}
+        state["type"] = "state"
+
+        self._states[seq] = state
+        for old in [s for s in self._states if s <= seq - self.size]:
+            del self._states[old]
+        self.last_seq = seq
+        return state
+
+
+class InputHistory:
+    """
+    Client 예측용: 보냈지만 host가 아직 처리하지 않은 (seq, 입력) 링버퍼
+    - push(): 틱마다 보낸 입력 기록
+    - ack(seq): host가 처리한 seq 이하 제거 → pending()만 재적용(replay)
+    """
+
+    def __init__(self, size: int = 128):
+        self._entries: deque = deque(maxlen=size)
+
+    def clear(self):
+        self._entries.clear()
+
+    def push(self, seq: int, inp):
+        self._entries.append((seq, inp))
+
+    def ack(self, seq: int):
+        while self._entries and self._entries[0][0] <= seq:
+            self._entries.popleft()
+
+    def pending(self):
+        return list(self._entries)
+
+
+def _lerp_angle(a0: float, a1: float, t: float) -> float:
+    # 최단 방향으로 회전 보간
+    d = (a1 - a0 + math.pi) % (2 * math.pi) - math.pi
+    return a0 + d * t
+
+
+class SnapshotBuffer:
+    """
+    Client 보간용: 받은 state를 server_time 순으로 보관
+    - sample_cars(render_time): render_time을 감싸는 두 스냅샷 사이를 선형 보간
+    - render_time이 최신 스냅샷보다 뒤면 속도/각도로 최대 max_extrapolation초까지만 외삽
+    """
+
+    def __init__(self, size: int = 32, max_extrapolation: float = 0.1):
+        self.max_extrapolation = max_extrapolation
+        self._snaps: deque = deque(maxlen=size)
+
+    def clear(self):
+        self._snaps.clear()
+
+    def push(self, state: dict):
+        t = state.get("server_time")
+        if t is None or not state.get("cars"):
+            return
+        if self._snaps and t <= self._snaps[-1][0]:
+            return
+        self._snaps.append((float(t), state["cars"]))
+
+    def sample_cars(self, render_time: float) -> list[dict] | None:
+        snaps = list(self._snaps)
+        if not snaps:
+            return None
+
+        # 버퍼보다 이전 시점이면 가장 오래된 것 그대로
+        if render_time <= snaps[0][0]:
+            return [{"x": c["x"], "y": c["y"], "a": c["a"]} for c in snaps[0][1]]
+
+        for (t0, cars0), (t1, cars1) in zip(snaps, snaps[1:]):
+            if t0 <= render_time <= t1:
+                k = (render_time - t0) / (t1 - t0) if t1 > t0 else 1.0
+                return [
+                    {
+                        "x": c0["x"] + (c1["x"] - c0["x"]) * k,
+                        "y": c0["y"] + (c1["y"] - c0["y"]) * k,
+                        "a": _lerp_angle(c0["a"], c1["a"], k),
+                    }
+                    for c0, c1 in zip(cars0, cars1)
+                ]
+
+        # 최신 스냅샷 이후: 짧게 외삽 (dead reckoning)
+        t_last, cars_last = snaps[-1]
+        dt = min(render_time - t_last, self.max_extrapolation)
+        return [
+            {
+                "x": c["x"] + math.cos(c["a"]) * c.get("s", 0.0) * dt,
+                "y": c["y"] + math.sin(c["a"]) * c.get("s", 0.0) * dt,
+                "a": c["a"],
+            }
+            for c in cars_last
+        ]
+
+
+class ClockSync:
+    """
+    NTP 방식 시계 동기화 (client ping t0 → host 수신 t1 / 송신 t2 → client 수신 t3):
+    - rtt = (t3 - t0) - (t2 - t1), offset = ((t1 - t0) + (t2 - t3)) / 2
+    - 최근 window개 샘플 중 RTT가 가장 작은 샘플의 offset 사용 (큐 지연/지터가 낀 샘플은 경로가 비대칭이라 배제)
+    - 처음 fast_samples개는 fast_interval 간격으로 빠르게 모으고, 이후 interval 간격
+    - offset: host 시계 - 내 시계 (host 시각 ≈ time.monotonic() + offset)
+    """
+
+    def __init__(self, window: int = 16, fast_samples: int = 8, fast_interval: float = 0.1, interval: float = 2.0):
+        self.fast_samples = fast_samples
+        self.fast_interval = fast_interval
+        self.interval = interval
+        self.samples: deque = deque(maxlen=window)  # (rtt, offset)
+        self.count = 0
+        # 이벤트 루프가 갱신하고 게임 루프가 읽음 → (offset, min_rtt, 최근 rtt) tuple로 통째로 교체
+        self._result: tuple[float, float, float] | None = None
+
+    @property
+    def synced(self) -> bool:
+        return self._result is not None
+
+    @property
+    def offset(self) -> float:
+        return self._result[0] if self._result else 0.0
+
+    @property
+    def min_rtt(self) -> float | None:
+        return self._result[1] if self._result else None
+
+    @property
+    def rtt(self) -> float | None:
+        """가장 최근 샘플의 RTT (현재 지연 상태)"""
+        return self._result[2] if self._result else None
+
+    def next_interval(self) -> float:
+        return self.fast_interval if self.count < self.fast_samples else self.interval
+
+    def make_ping(self, now: float) -> dict:
+        # 내가 잰 RTT도 실어 보냄 (host의 전송 주기 조절용)
+        ping = {"type": "ping", "t0": now}
+        if self._result is not None:
+            ping["rtt"] = self._result[2]
+        return ping
+
+    @staticmethod
+    def make_pong(ping: dict, received_at: float, now: float) -> dict:
+        return {"type": "pong", "t0": ping.get("t0"), "t1": received_at, "t2": now}
+
+    def on_pong(self, msg: dict, now: float) -> bool:
+        try:
+            t0, t1, t2 = float(msg["t0"]), float(msg["t1"]), float(msg["t2"])
+        except (KeyError, TypeError, ValueError):
+            return False
+        rtt = (now - t0) - (t2 - t1)
+        if rtt < 0:
+            return False
+        self.samples.append((rtt, ((t1 - t0) + (t2 - now)) / 2))
+        self.count += 1
+        best_rtt, best_offset = min(self.samples)
+        self._result = (best_offset, best_rtt, rtt)
+        return True
+
+
+class InputSender:
+    """
+    Client input 전송 조절 (틱마다 보내던 것을 바뀔 때만):
+    - 입력(버튼/이모트)이 바뀌면 그 틱부터 redundancy틱 동안 연속 전송 (UDP 유실 대비)
+    - 안 바뀌어도 keepalive틱마다 한 번 (state ack 갱신 / host의 입력 유지 한도)
+      (벽시계가 아니라 틱 기준 → 프레임이 밀려도 host의 ack 추정과 어긋나지 않음)
+    - count: 보낸 input 메시지 수 (메시지의 "n" → host가 손실률 계산)
+    """
+
+    def __init__(self, redundancy: int = 3, keepalive: int = INPUT_KEEPALIVE_TICKS):
+        self.redundancy = redundancy
+        self.keepalive = keepalive
+        self.count = 0
+        self._last_input = None
+        self._repeat = 0
+        self._last_tick = None
+
+    def reset(self):
+        self._last_input = None
+        self._repeat = 0
+        self._last_tick = None
+
+    def should_send(self, inp, tick: int) -> bool:
+        if inp != self._last_input:
+            self._last_input = inp
+            self._repeat = self.redundancy
+        if self._repeat > 0:
+            self._repeat -= 1
+        elif self._last_tick is not None and tick - self._last_tick < self.keepalive:
+            return False
+        self._last_tick = tick
+        self.count += 1
+        return True
+
+
+class SendRateController:
+    """
+    Host → client state 전송 주기 (peer별, min_rate ~ max_rate Hz):
+    - interval초마다 update(rtt, loss, congested)로 링크 상태 평가
+    - 나쁨 (RTT > rtt_high / 손실률 > loss_high / 송신 큐 적체) → rate * decrease (빠르게 후퇴)
+    - 좋음 (RTT < rtt_high / 2, 손실률 < loss_high / 4, 적체 없음) → rate + increase (천천히 회복)
+    - 그 사이면 유지
+    """
+
+    def __init__(
+        self,
+        min_rate: float,
+        max_rate: float,
+        interval: float = 1.0,
+        rtt_high: float = 0.15,
+        loss_high: float = 0.05,
+        increase: float = 5.0,
+        decrease: float = 0.5,
+    ):
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.interval = interval
+        self.rtt_high = rtt_high
+        self.loss_high = loss_high
+        self.increase = increase
+        self.decrease = decrease
+        self.rate = max_rate
+        self._elapsed = 0.0
+
+    def due(self, dt: float) -> bool:
+        """평가 주기가 됐으면 True"""
+        self._elapsed += dt
+        if self._elapsed < self.interval:
+            return False
+        self._elapsed = 0.0
+        return True
+
+    def update(self, rtt: float | None, loss: float | None, congested: bool) -> float:
+        rtt = rtt or 0.0
+        loss = loss or 0.0
+        if congested or rtt > self.rtt_high or loss > self.loss_high:
+            self.rate = max(self.min_rate, self.rate * self.decrease)
+        elif rtt < self.rtt_high / 2 and loss < self.loss_high / 4:
+            self.rate = min(self.max_rate, self.rate + self.increase)
+        return self.rate
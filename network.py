@@ -1,10 +1,22 @@
 # network.py
-import socket, json, time
+import socket, json, struct, time, threading
+from abc import ABC, abstractmethod
+from collections import deque
 
-UDP_PORT = 37020  # 방 검색용(고정)
+try:
+    import fcntl  # Linux/macOS: 인터페이스별 주소/broadcast 조회 (ioctl)
+except ImportError:
+    fcntl = None
+
+import protocol
+
+UDP_PORT = 37020  # 방 광고(beacon) 수신용(고정)
+QUERY_PORT = 37021  # 방 검색 질의 수신용(고정, host가 bind)
+MCAST_GROUP = "239.255.37.21"  # 검색 질의 multicast 그룹 (TTL 1 → 같은 LAN만)
 BROADCAST_ADDR = "255.255.255.255"
 
-def get_local_ip():
+def _route_ip():
+    # 기본 라우트 쪽 IP (UDP connect는 패킷을 보내지 않음)
     s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
     try:
         s.connect(("8.8.8.8", 80))
@@ -15,105 +27,483 @@ def get_local_ip():
         s.close()
     return ip
 
-def broadcast_room(room_id, room_name, tcp_port, interval=0.5, stop_flag=None):
-    """Host: LAN에 방 정보를 주기적으로 광고(UDP broadcast)"""
-    ip = get_local_ip()
-    payload = {
-        "type": "room_announce",
-        "room_id": room_id,
-        "room_name": room_name,
-        "ip": ip,
-        "port": tcp_port,
-        "ts": time.time(),
-    }
-    msg = (json.dumps(payload) + "\n").encode("utf-8")
+# ---------------- interfaces ----------------
+_SIOCGIFFLAGS = 0x8913
+_SIOCGIFADDR = 0x8915
+_SIOCGIFBRDADDR = 0x8919
+_IFF_UP = 0x1
+_IFF_BROADCAST = 0x2
+_IFF_LOOPBACK = 0x8
 
+def _ioctl_interfaces():
+    """Linux: (이름, ip, broadcast) 목록 (UP이고 loopback이 아닌 IPv4 인터페이스만)"""
+    result = []
     s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-    s.setsockopt(socket.SOL_SOCKET, socket.SO_BROADCAST, 1)
-    s.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
     try:
-        while True:
-            if stop_flag is not None and stop_flag.is_set():
-                break
-            s.sendto(msg, (BROADCAST_ADDR, UDP_PORT))
-            time.sleep(interval)
+        for _idx, name in socket.if_nameindex():
+            ifreq = struct.pack("256s", name.encode("utf-8")[:15])
+            try:
+                (flags,) = struct.unpack_from("H", fcntl.ioctl(s.fileno(), _SIOCGIFFLAGS, ifreq), 16)
+                if not flags & _IFF_UP or flags & _IFF_LOOPBACK:
+                    continue
+                ip = socket.inet_ntoa(fcntl.ioctl(s.fileno(), _SIOCGIFADDR, ifreq)[20:24])
+                brd = None
+                if flags & _IFF_BROADCAST:
+                    brd = socket.inet_ntoa(fcntl.ioctl(s.fileno(), _SIOCGIFBRDADDR, ifreq)[20:24])
+            except OSError:
+                continue  # IPv4 주소가 없는 인터페이스
+            result.append((name, ip, brd))
     finally:
         s.close()
+    return result
+
+def _fallback_interfaces():
+    """ioctl을 못 쓰는 OS: 호스트 이름으로 찾은 IPv4 + 기본 라우트 IP, broadcast는 /24로 가정"""
+    ips = []
+    try:
+        for info in socket.getaddrinfo(socket.gethostname(), None, socket.AF_INET):
+            ips.append(info[4][0])
+    except OSError:
+        pass
+    ips.append(_route_ip())
+    result = []
+    for ip in dict.fromkeys(ips):
+        if not ip.startswith("127."):
+            result.append((ip, ip, ip.rsplit(".", 1)[0] + ".255"))
+    return result
 
-def discover_rooms(listen_seconds=1.2):
-    """Client: UDP로 방 광고를 잠깐 수신해서 목록 수집"""
+class InterfaceCache:
+    """
+    로컬 IPv4 인터페이스 정보 캐시 (메뉴가 매 프레임 소켓을 만들지 않도록):
+    - 처음 사용할 때 한 번 조회, 이후 refresh_interval초가 지난 뒤 사용할 때만 다시 조회
+    - local_ip(): 기본 라우트 쪽 IP (화면 표시/방 광고용)
+    - broadcast_addrs() / interface_ips(): 여러 NIC에 각각 beacon/질의를 보내기 위한 목록
+    - 게임 루프와 이벤트 루프 양쪽에서 호출 → 조회 결과는 tuple 하나로 통째로 교체
+    """
+
+    def __init__(self, refresh_interval=30.0):
+        self.refresh_interval = refresh_interval
+        self._info = None  # (조회 시각, 기본 IP, [(이름, ip, broadcast), ...])
+
+    def refresh(self):
+        try:
+            ifaces = _ioctl_interfaces() if fcntl is not None and hasattr(socket, "if_nameindex") else []
+        except OSError:
+            ifaces = []
+        if not ifaces:
+            ifaces = _fallback_interfaces()
+        self._info = (time.monotonic(), _route_ip(), ifaces)
+        return self._info
+
+    def _get(self):
+        info = self._info
+        if info is None or time.monotonic() - info[0] > self.refresh_interval:
+            info = self.refresh()
+        return info
+
+    def local_ip(self):
+        return self._get()[1]
+
+    def interfaces(self):
+        return list(self._get()[2])
+
+    def interface_ips(self):
+        return [ip for _name, ip, _brd in self._get()[2]]
+
+    def broadcast_addrs(self):
+        """인터페이스별 broadcast 주소 (하나도 없으면 255.255.255.255)"""
+        addrs = [brd for _name, _ip, brd in self._get()[2] if brd]
+        return list(dict.fromkeys(addrs)) or [BROADCAST_ADDR]
+
+interfaces = InterfaceCache()
+
+def get_local_ip():
+    """기본 라우트 쪽 로컬 IP (캐시됨)"""
+    return interfaces.local_ip()
+
+def discovery_bind():
+    """Client: 방 광고 수신용 UDP 소켓 (같은 PC의 다른 client와 포트 공유)"""
     s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
     s.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
     s.bind(("", UDP_PORT))
-    s.settimeout(0.2)
+    s.setblocking(False)
+    return s
 
-    rooms = {}
-    deadline = time.time() + listen_seconds
+def query_bind():
+    """Client: 검색 질의 송신 + host 응답(unicast) 수신용 UDP 소켓 (임의 포트)"""
+    s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    s.setsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_TTL, 1)
+    s.bind(("", 0))
+    s.setblocking(False)
+    return s
+
+def announce_bind():
+    """
+    Host: 검색 질의 수신 + 응답/beacon 송신용 UDP 소켓
+    - 같은 PC의 여러 방(헤드리스 서버)이 QUERY_PORT를 공유 (multicast는 모두에게 전달됨)
+    - multicast 그룹 가입 실패 시(라우트 없음 등) 질의는 못 받고 beacon만 동작
+    """
+    s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    s.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    s.setsockopt(socket.SOL_SOCKET, socket.SO_BROADCAST, 1)
+    s.bind(("", QUERY_PORT))
+    # NIC마다 그룹 가입 (기본 인터페이스 하나만 가입하면 다른 NIC 쪽 질의를 못 받음)
+    joined = 0
+    for ip in interfaces.interface_ips() or ["0.0.0.0"]:
+        try:
+            mreq = struct.pack("4s4s", socket.inet_aton(MCAST_GROUP), socket.inet_aton(ip))
+            s.setsockopt(socket.IPPROTO_IP, socket.IP_ADD_MEMBERSHIP, mreq)
+            joined += 1
+        except OSError as e:
+            print("MULTICAST JOIN FAIL:", ip, e)
+    if not joined:
+        print("MULTICAST JOIN FAIL: beacon only")
+    s.setblocking(False)
+    return s
+
+def encode_discovery(obj):
+    return (json.dumps(obj) + "\n").encode("utf-8")
+
+def decode_discovery(data):
+    """방 검색 데이터그램(JSON line) -> dict (깨졌으면 None)"""
     try:
-        while time.time() < deadline:
-            try:
-                data, _ = s.recvfrom(2048)
-            except socket.timeout:
-                continue
-            except Exception:
-                continue
+        obj = json.loads(data.decode("utf-8").strip())
+    except Exception:
+        return None
+    return obj if isinstance(obj, dict) else None
 
-            try:
-                line = data.decode("utf-8").strip()
-                obj = json.loads(line)
-            except Exception:
-                continue
+def decode_announce(data, addr):
+    """방 광고/질의 응답 데이터그램 -> dict (room_announce가 아니거나 깨졌으면 None)"""
+    obj = decode_discovery(data)
+    if obj is None or obj.get("type") != "room_announce" or not obj.get("room_id"):
+        return None
+    # 접속은 실제로 패킷이 온 주소로 (NIC가 여러 개인 host는 광고한 ip가 이쪽 망이 아닐 수 있음)
+    obj["ip"] = addr[0]
+    return obj
 
-            if obj.get("type") != "room_announce":
-                continue
-            rid = obj.get("room_id")
-            if not rid:
-                continue
-            rooms[rid] = obj
-    finally:
-        s.close()
+# ---------------- room table ----------------
+class RoomTable:
+    """
+    검색된 방 목록 (room_id 기준, 게임 루프에서만 접근):
+    - update(obj): 광고를 받을 때마다 last_seen 갱신, 내용이 바뀌었으면 변경으로 기록
+    - evict(): ttl초 동안 광고가 없던 방 제거
+    - 변경은 (종류, room_id) 리스트로 반환 → 화면은 바뀐 경우에만 목록을 다시 구성
+      (종류: "added" / "updated" / "removed")
+    """
+
+    # 내용 비교에서 제외하는 키 (매 광고마다 바뀌는 값)
+    _VOLATILE_KEYS = ("ts",)
+
+    def __init__(self, ttl=3.0):
+        self.ttl = ttl
+        self.rooms = {}
+        self._last_seen = {}
+
+    def update(self, obj, now=None):
+        now = time.monotonic() if now is None else now
+        rid = obj["room_id"]
+        old = self.rooms.get(rid)
+        self.rooms[rid] = obj
+        self._last_seen[rid] = now
+        if old is None:
+            return ("added", rid)
+        if self._content(old) != self._content(obj):
+            return ("updated", rid)
+        return None
+
+    def evict(self, now=None):
+        now = time.monotonic() if now is None else now
+        expired = [rid for rid, t in self._last_seen.items() if now - t > self.ttl]
+        for rid in expired:
+            del self.rooms[rid]
+            del self._last_seen[rid]
+        return [("removed", rid) for rid in expired]
+
+    def clear(self):
+        removed = [("removed", rid) for rid in self.rooms]
+        self.rooms.clear()
+        self._last_seen.clear()
+        return removed
+
+    def sorted_rooms(self):
+        return sorted(self.rooms.values(), key=lambda r: (r.get("room_name", ""), r.get("ip", ""), r["room_id"]))
 
-    return rooms
+    def _content(self, obj):
+        return {k: v for k, v in obj.items() if k not in self._VOLATILE_KEYS}
 
-# ---------------- TCP JSON line ----------------
-class JsonLineSocket:
-    def __init__(self, sock):
-        self.sock = sock
-        self.buf = b""
+# ---------------- outbound queue ----------------
+class SendQueue:
+    """
+    연결별 송신 큐 (게임 루프는 put만 하고 이벤트 루프가 꺼내서 write):
+    - key가 있는 메시지(state/input)는 아직 안 나간 같은 key 메시지를 최신 것으로 교체(coalesce)
+    - sticky=True 메시지(1회성 emote_req가 실린 input)는 교체되지 않고, 이후 같은 key 메시지는 그 뒤에 새로 쌓임
+    - 그 외 제어 메시지는 순서대로 모두 전송
+    - stats(): 대기 개수/바이트, 최대 깊이, coalesce 횟수 등
+    """
 
-    def send(self, obj):
-        self.sock.sendall((json.dumps(obj) + "\n").encode("utf-8"))
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._items = deque()  # [key, data]
+        self._latest = {}  # key -> 대기 중인 entry
+        self.closed = False
 
-    def recv(self):
-        while b"\n" not in self.buf:
-            chunk = self.sock.recv(4096)
-            if not chunk:
+        self.bytes_pending = 0
+        self.max_depth = 0
+        self.enqueued = 0
+        self.coalesced = 0
+        self.sent = 0
+
+    def put(self, data, key=None, sticky=False):
+        with self._cond:
+            if self.closed:
+                return
+            self.enqueued += 1
+            if sticky and key is not None:
+                # 덮어쓰지도, 덮어써지지도 않음 (순서 유지: 앞에 대기 중인 것 → 이 메시지 → 이후 메시지)
+                self._latest.pop(key, None)
+                key = None
+            entry = self._latest.get(key) if key is not None else None
+            if entry is not None:
+                # 아직 못 나간 이전 state/input은 버리고 최신 것으로 교체
+                self.bytes_pending += len(data) - len(entry[1])
+                entry[1] = data
+                self.coalesced += 1
+            else:
+                entry = [key, data]
+                self._items.append(entry)
+                self.bytes_pending += len(data)
+                if key is not None:
+                    self._latest[key] = entry
+                self.max_depth = max(self.max_depth, len(self._items))
+            self._cond.notify()
+
+    def get(self):
+        """다음 보낼 bytes (비어 있으면 대기, 큐가 닫히면 None)"""
+        with self._cond:
+            while not self._items and not self.closed:
+                self._cond.wait()
+            if not self._items:
+                return None
+            return self._pop()
+
+    def _pop(self):
+        key, data = self._items.popleft()
+        if key is not None and self._latest.get(key) is not None and self._latest[key][1] is data:
+            del self._latest[key]
+        self.bytes_pending -= len(data)
+        self.sent += 1
+        return data
+
+    def get_nowait(self):
+        """get()과 같지만 비어 있으면 바로 None (이벤트 루프에서 사용)"""
+        with self._cond:
+            if not self._items:
                 return None
-            self.buf += chunk
-        line, self.buf = self.buf.split(b"\n", 1)
-        if not line:
+            return self._pop()
+
+    def close(self):
+        with self._cond:
+            self.closed = True
+            self._cond.notify_all()
+
+    def stats(self):
+        with self._cond:
+            return {
+                "depth": len(self._items),
+                "bytes": self.bytes_pending,
+                "max_depth": self.max_depth,
+                "enqueued": self.enqueued,
+                "coalesced": self.coalesced,
+                "sent": self.sent,
+            }
+
+# ---------------- stream framing ----------------
+class FrameCodec(ABC):
+    """
+    TCP 스트림 프레이밍 공통 (JsonLineCodec / BinaryFrameCodec):
+    - 수신 바이트는 bytearray 버퍼에 직접 채우고 (get_buffer → buffer_updated)
+      (시작, 끝) 오프셋으로 프레임을 잘라냄 (bytes += / split 반복 없음)
+    - 버퍼가 찼을 때만 남은 바이트를 앞으로 당기거나 두 배로 키움
+    - drain(): 버퍼에 있는 완성 프레임을 모두 꺼내고, latest_only 타입은 가장 새 것만 디코딩
+      (단 pinned 프레임 = 1회성 emote_req가 실린 input은 더 새 것이 있어도 디코딩)
+    """
+
+    RECV_BUFSIZE = 65536
+
+    def __init__(self, initial=b""):
+        self._buf = bytearray(max(self.RECV_BUFSIZE, len(initial) * 2))
+        self._view = memoryview(self._buf)
+        self._start = 0
+        self._end = len(initial)
+        self._buf[: self._end] = initial
+        self.skipped = 0  # 디코딩 없이 건너뛴 superseded 프레임 수
+
+    # --- 하위 클래스 구현 ---
+    @abstractmethod
+    def encode(self, obj):
+        ...
+
+    @abstractmethod
+    def next_frame(self):
+        """버퍼 앞쪽 완성 프레임 1개 -> (type 이름|None, 시작, 끝, 디코딩 인자). 없으면 None"""
+
+    @abstractmethod
+    def decode(self, frame):
+        ...
+
+    def pinned(self, frame):
+        """더 새 프레임이 있어도 건너뛰면 안 되는 프레임인지 (디코딩 없이 판단)"""
+        return False
+
+    # --- 수신 버퍼 ---
+    def get_buffer(self):
+        """recv_into로 채울 빈 영역 (asyncio.BufferedProtocol.get_buffer와 같은 용도)"""
+        if self._end == len(self._buf):
+            pending = self._end - self._start
+            if self._start > 0:
+                # 이미 처리한 앞부분을 버리고 남은 바이트를 앞으로 당김
+                self._buf[:pending] = self._buf[self._start:self._end]
+            else:
+                # 버퍼보다 큰 프레임: 두 배로 키움
+                self._view.release()
+                self._buf.extend(bytes(len(self._buf)))
+                self._view = memoryview(self._buf)
+            self._start, self._end = 0, pending
+        return self._view[self._end:]
+
+    def buffer_updated(self, nbytes):
+        self._end += nbytes
+
+    def leftover(self):
+        """아직 처리하지 않은 수신 바이트 (포맷 전환 시 다음 codec으로 넘김)"""
+        return bytes(self._buf[self._start:self._end])
+
+    def drain(self, latest_only=()):
+        """완성된 프레임을 모두 디코딩한 메시지 리스트. 프레임 오류면 ProtocolError"""
+        frames = []
+        while True:
+            frame = self.next_frame()
+            if frame is None:
+                break
+            frames.append(frame)
+
+        last = {f[0]: i for i, f in enumerate(frames) if f[0] in latest_only}
+        out = []
+        for i, frame in enumerate(frames):
+            if frame[0] in last and last[frame[0]] != i and not self.pinned(frame):
+                self.skipped += 1
+                continue
+            msg = self.decode(frame)
+            if msg is not None:
+                out.append(msg)
+        return out
+
+class JsonLineCodec(FrameCodec):
+    # 디코딩 없이 종류를 알아볼 타입 (json.dumps 기본 구분자 기준)
+    _TYPE_MARKERS = {t: f'"type": "{t}"'.encode("utf-8") for t in ("state", "input")}
+    _EMOTE_MARKER = b'"emote_req": '
+
+    def encode(self, obj):
+        return (json.dumps(obj) + "\n").encode("utf-8")
+
+    def next_frame(self):
+        nl = self._buf.find(b"\n", self._start, self._end)
+        if nl < 0:
+            return None
+        s, self._start = self._start, nl + 1
+        kind = None
+        for t, marker in self._TYPE_MARKERS.items():
+            if self._buf.find(marker, s, nl) >= 0:
+                kind = t
+                break
+        return (kind, s, nl, None)
+
+    def decode(self, frame):
+        _kind, s, e, _ = frame
+        if s == e:
             return None
         try:
-            return json.loads(line.decode("utf-8"))
+            return json.loads(self._buf[s:e].decode("utf-8"))
         except Exception:
             return None
 
-    def close(self):
+    def pinned(self, frame):
+        kind, s, e, _ = frame
+        if kind != "input":
+            return False
+        i = self._buf.find(self._EMOTE_MARKER, s, e)
+        if i < 0:
+            return False
+        i += len(self._EMOTE_MARKER)
+        return i < e and self._buf[i] != ord("0")
+
+class BinaryFrameCodec(FrameCodec):
+    """JsonLineCodec과 같은 인터페이스, protocol.py 바이너리 프레임 사용"""
+
+    def encode(self, obj):
+        return protocol.encode_message(obj)
+
+    def next_frame(self):
+        hs = protocol.HEADER.size
+        if self._end - self._start < hs:
+            return None
+        msg_type, length = protocol.parse_header(self._view[self._start:self._start + hs])
+        s = self._start + hs
+        e = s + length
+        if e > self._end:
+            return None
+        self._start = e
+        return (protocol.message_name(msg_type), s, e, msg_type)
+
+    def decode(self, frame):
+        _kind, s, e, msg_type = frame
         try:
-            self.sock.close()
+            return protocol.decode_payload(msg_type, self._view[s:e])
         except Exception:
-            pass
+            return None
+
+    def pinned(self, frame):
+        kind, s, e, _ = frame
+        if kind != "input":
+            return False
+        try:
+            return protocol.peek_input_emote(self._view[s:e]) > 0
+        except Exception:
+            return False
+
+def decode_datagram(data):
+    """UDP 데이터그램 1개 = 바이너리 프레임 1개 -> 메시지 (깨졌거나 길이가 안 맞으면 None)"""
+    if len(data) < protocol.HEADER.size:
+        return None
+    try:
+        msg_type, length = protocol.parse_header(data)
+        if protocol.HEADER.size + length != len(data):
+            return None
+        return protocol.decode_payload(msg_type, memoryview(data)[protocol.HEADER.size:])
+    except Exception:
+        return None
+
+def set_nodelay(sock):
+    # 작은 state/input 프레임이 Nagle에 묶여 지연되지 않도록
+    try:
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+    except OSError:
+        pass
 
-def tcp_host_listen(port):
+def tcp_host_listen(port, backlog=1):
     srv = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
     srv.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
     srv.bind(("", port))
-    srv.listen(1)
+    srv.listen(backlog)
+    srv.setblocking(False)
     return srv
 
-def tcp_client_connect(host_ip, port, timeout=4.0):
-    s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-    s.settimeout(timeout)
-    s.connect((host_ip, port))
-    s.settimeout(None)
+def udp_bind(port=0):
+    """state/input용 UDP 소켓 (지정 포트를 못 쓰면 임의 포트)"""
+    s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    try:
+        s.bind(("", port))
+    except OSError:
+        s.bind(("", 0))
+    s.setblocking(False)
     return s
@@ -0,0 +1,284 @@
+# protocol.py
+"""
+바이너리 와이어 프로토콜 (JSON line 대체, 연결별 선택):
+- 프레임 = 헤더(version u8, type u8, payload 길이 u16) + payload
+- state / input / map_select / rematch_vote / match_result 는 고정 struct 레이아웃
+  (payload 맨 앞 u16 비트마스크로 "들어있는 필드"를 표시 → 없는 키는 전송하지 않음)
+- 그 외 메시지 타입은 MSG_JSON 프레임(payload = JSON utf-8)으로 그대로 전달
+"""
+import json
+import math
+import struct
+
+PROTOCOL_VERSION = 8
+WIRE_JSON = "json"
+WIRE_BINARY = f"bin{PROTOCOL_VERSION}"
+
+HEADER = struct.Struct("!BBH")
+MAX_PAYLOAD = 0xFFFF
+
+MSG_JSON = 0
+MSG_STATE = 1
+MSG_INPUT = 2
+MSG_MAP_SELECT = 3
+MSG_REMATCH_VOTE = 4
+MSG_MATCH_RESULT = 5
+
+_U8 = struct.Struct("!B")
+_U16 = struct.Struct("!H")
+_U32 = struct.Struct("!I")
+_I16 = struct.Struct("!h")
+_F32 = struct.Struct("!f")
+_F64 = struct.Struct("!d")
+
+# -----------------------------
+# 필드 스펙: (키, 종류[, 인자])
+# -----------------------------
+_CAR_FIELDS = [
+    ("x", "f32"),
+    ("y", "f32"),
+    ("a", "f32"),
+    ("s", "f32"),
+    ("e", "u8"),
+    ("hi", "bool"),
+    ("bt", "f32"),
+]
+
+_STATE_FIELDS = [
+    ("server_time", "f64"),
+    ("start_at", "opt_f64"),
+    ("go_until", "opt_f64"),
+    ("race_started", "bool"),
+    ("map", "u8"),
+    ("items", "items"),
+    ("cars", "list", _CAR_FIELDS),
+    ("cps", "u8_list"),
+    ("winner", "winner"),
+    ("seq", "u32"),
+    ("base", "u32"),  # 있으면 delta (base seq 스냅샷 기준)
+    ("acks", "u32_list"),  # 차량별로 host가 마지막으로 처리한 input seq
+    ("clock", "f64"),  # server_time 시점의 host monotonic 시각 (ClockSync offset과 함께 시각 환산)
+]
+
+_INPUT_FIELDS = [
+    ("throttle", "bool"),
+    ("brake", "bool"),
+    ("left", "bool"),
+    ("right", "bool"),
+    ("boost", "bool"),
+    ("emote_req", "u8"),
+    ("ack", "u32"),  # 마지막으로 복원한 state seq
+    ("seq", "u32"),  # input 순번 (UDP에서 오래된 입력 drop)
+    ("n", "u32"),  # 보낸 input 메시지 번호 (바뀔 때만 보내므로 seq와 별도, host 손실률 계산용)
+    ("emote_seq", "u32"),  # emote_req를 처음 실은 input seq (ack 전까지 재전송하므로 host가 중복 적용 안 하도록)
+]
+
+_MAP_SELECT_FIELDS = [
+    ("map", "u8"),
+    ("start", "bool"),
+    ("players", "u8"),  # 이번 판 차량 수
+]
+
+_REMATCH_VOTE_FIELDS = [
+    ("vote", "opt_bool"),
+]
+
+_MATCH_RESULT_FIELDS = [
+    ("action", "enum", ("restart", "quit")),
+]
+
+# type 문자열 <-> (메시지 코드, 필드 스펙)
+_SPECS = {
+    "state": (MSG_STATE, _STATE_FIELDS),
+    "input": (MSG_INPUT, _INPUT_FIELDS),
+    "map_select": (MSG_MAP_SELECT, _MAP_SELECT_FIELDS),
+    "rematch_vote": (MSG_REMATCH_VOTE, _REMATCH_VOTE_FIELDS),
+    "match_result": (MSG_MATCH_RESULT, _MATCH_RESULT_FIELDS),
+}
+_TYPES = {code: (name, fields) for name, (code, fields) in _SPECS.items()}
+
+
+# 고정 길이 필드 크기 (디코딩 없이 특정 필드 위치를 셀 때 사용)
+_FIXED_SIZES = {"f64": 8, "opt_f64": 8, "f32": 4, "u8": 1, "u32": 4, "bool": 1, "opt_bool": 1, "enum": 1, "winner": 1}
+_INPUT_EMOTE_BIT = next(bit for bit, spec in enumerate(_INPUT_FIELDS) if spec[0] == "emote_req")
+
+
+class ProtocolError(Exception):
+    pass
+
+
+# -----------------------------
+# 필드 인코딩
+# -----------------------------
+def _encode_value(kind: str, arg, value, out: list):
+    if kind == "f64":
+        out.append(_F64.pack(float(value)))
+    elif kind == "opt_f64":
+        out.append(_F64.pack(math.nan if value is None else float(value)))
+    elif kind == "f32":
+        out.append(_F32.pack(float(value)))
+    elif kind == "u8":
+        out.append(_U8.pack(int(value)))
+    elif kind == "u32":
+        out.append(_U32.pack(int(value)))
+    elif kind == "bool":
+        out.append(_U8.pack(1 if value else 0))
+    elif kind == "opt_bool":
+        out.append(_U8.pack(2 if value is None else (1 if value else 0)))
+    elif kind == "enum":
+        out.append(_U8.pack(arg.index(value)))
+    elif kind == "winner":
+        # None -> 0, "P3" -> 3
+        out.append(_U8.pack(0 if not value else int(str(value)[1:])))
+    elif kind == "u8_list":
+        out.append(_U8.pack(len(value)))
+        out.append(bytes(int(v) for v in value))
+    elif kind == "u32_list":
+        out.append(_U8.pack(len(value)))
+        out.extend(_U32.pack(int(v)) for v in value)
+    elif kind == "items":
+        out.append(_U8.pack(len(value)))
+        for it in value:
+            out.append(_I16.pack(int(it["x"])))
+            out.append(_I16.pack(int(it["y"])))
+    elif kind == "list":
+        out.append(_U8.pack(len(value)))
+        for sub in value:
+            _encode_fields(arg, sub, out)
+    else:
+        raise ProtocolError(f"unknown field kind: {kind}")
+
+
+def _encode_fields(fields, obj: dict, out: list):
+    mask = 0
+    body: list[bytes] = []
+    for bit, spec in enumerate(fields):
+        key, kind = spec[0], spec[1]
+        if key not in obj:
+            continue
+        mask |= 1 << bit
+        _encode_value(kind, spec[2] if len(spec) > 2 else None, obj[key], body)
+    out.append(_U16.pack(mask))
+    out.extend(body)
+
+
+# -----------------------------
+# 필드 디코딩
+# -----------------------------
+def _decode_value(kind: str, arg, data, pos: int):
+    if kind in ("f64", "opt_f64"):
+        (v,) = _F64.unpack_from(data, pos)
+        if kind == "opt_f64" and math.isnan(v):
+            v = None
+        return v, pos + 8
+    if kind == "f32":
+        return _F32.unpack_from(data, pos)[0], pos + 4
+    if kind == "u8":
+        return data[pos], pos + 1
+    if kind == "u32":
+        return _U32.unpack_from(data, pos)[0], pos + 4
+    if kind == "bool":
+        return data[pos] != 0, pos + 1
+    if kind == "opt_bool":
+        v = data[pos]
+        return (None if v == 2 else v == 1), pos + 1
+    if kind == "enum":
+        return arg[data[pos]], pos + 1
+    if kind == "winner":
+        v = data[pos]
+        return (f"P{v}" if v else None), pos + 1
+    if kind == "u8_list":
+        n = data[pos]
+        return list(data[pos + 1 : pos + 1 + n]), pos + 1 + n
+    if kind == "u32_list":
+        n = data[pos]
+        return [_U32.unpack_from(data, pos + 1 + 4 * i)[0] for i in range(n)], pos + 1 + 4 * n
+    if kind == "items":
+        n = data[pos]
+        pos += 1
+        items = []
+        for _ in range(n):
+            x = _I16.unpack_from(data, pos)[0]
+            y = _I16.unpack_from(data, pos + 2)[0]
+            items.append({"x": x, "y": y})
+            pos += 4
+        return items, pos
+    if kind == "list":
+        n = data[pos]
+        pos += 1
+        values = []
+        for _ in range(n):
+            sub, pos = _decode_fields(arg, data, pos)
+            values.append(sub)
+        return values, pos
+    raise ProtocolError(f"unknown field kind: {kind}")
+
+
+def _decode_fields(fields, data, pos: int):
+    (mask,) = _U16.unpack_from(data, pos)
+    pos += 2
+    obj = {}
+    for bit, spec in enumerate(fields):
+        if mask & (1 << bit):
+            obj[spec[0]], pos = _decode_value(spec[1], spec[2] if len(spec) > 2 else None, data, pos)
+    return obj, pos
+
+
+# -----------------------------
+# 프레임
+# -----------------------------
+def encode_message(obj: dict) -> bytes:
+    """dict 메시지 -> 바이너리 프레임 bytes"""
+    spec = _SPECS.get(obj.get("type"))
+    if spec is None:
+        msg_type = MSG_JSON
+        payload = json.dumps(obj).encode("utf-8")
+    else:
+        msg_type, fields = spec
+        parts: list[bytes] = []
+        _encode_fields(fields, obj, parts)
+        payload = b"".join(parts)
+
+    if len(payload) > MAX_PAYLOAD:
+        raise ProtocolError(f"payload too large: {len(payload)}")
+    return HEADER.pack(PROTOCOL_VERSION, msg_type, len(payload)) + payload
+
+
+def decode_payload(msg_type: int, payload) -> dict:
+    """프레임 payload -> dict 메시지 (payload는 bytes/memoryview 모두 가능)"""
+    if msg_type == MSG_JSON:
+        return json.loads(bytes(payload).decode("utf-8"))
+
+    spec = _TYPES.get(msg_type)
+    if spec is None:
+        raise ProtocolError(f"unknown message type: {msg_type}")
+    name, fields = spec
+    obj, _ = _decode_fields(fields, payload, 0)
+    obj["type"] = name
+    return obj
+
+
+def message_name(msg_type: int) -> str | None:
+    """메시지 코드 -> type 문자열 (MSG_JSON/알 수 없으면 None). 디코딩 없이 종류만 볼 때 사용"""
+    spec = _TYPES.get(msg_type)
+    return spec[0] if spec else None
+
+
+def peek_input_emote(payload) -> int:
+    """input payload에서 emote_req만 읽음 (전체 디코딩 없이, 없으면 0)"""
+    (mask,) = _U16.unpack_from(payload, 0)
+    if not mask & (1 << _INPUT_EMOTE_BIT):
+        return 0
+    pos = 2
+    for bit, spec in enumerate(_INPUT_FIELDS[:_INPUT_EMOTE_BIT]):
+        if mask & (1 << bit):
+            pos += _FIXED_SIZES[spec[1]]
+    return payload[pos]
+
+
+def parse_header(data) -> tuple[int, int]:
+    """헤더 -> (msg_type, payload 길이). 버전이 다르면 ProtocolError"""
+    version, msg_type, length = HEADER.unpack_from(data, 0)
+    if version != PROTOCOL_VERSION:
+        raise ProtocolError(f"protocol version mismatch: {version} != {PROTOCOL_VERSION}")
+    return msg_type, length
@@ -0,0 +1,524 @@
+# room.py
+"""
+host 쪽 방 로직 (디스플레이 없음, Game host 모드와 헤드리스 서버가 공유):
+- Transport 이벤트 루프 하나로 최대 max_players명까지 TCP 접속을 받고 (accept/read/write 모두 selector 기반)
+- 원격 플레이어마다 Peer: 연결, 차 인덱스, 입력 슬롯, state ack, UDP 주소
+- 차 인덱스 0..local_players-1은 host 화면 앞 플레이어, 그 뒤가 접속 순서대로 원격 플레이어
+- state는 틱마다 한 번 스냅샷 → ack baseline이 같은 peer끼리 묶어 포맷별로 한 번만 인코딩
+- 관전자(spectator): 읽기 전용, 플레이어와 별도 주기(spectator_rate)로 전체 state를 한 번 인코딩해서 전원에게
+  (느린 관전자는 자기 송신 큐에서 state가 coalesce될 뿐 플레이어 전송/틱에는 영향 없음)
+- state 전송 주기는 peer별로 min_state_rate~state_send_rate Hz 사이에서 RTT / 입력 손실률 / 송신 큐 적체에 맞춰 조절
+- client input은 바뀔 때만 오므로, 받은 입력을 다음 입력까지 계속 적용하고 그만큼 ack를 앞당김
+"""
+import time
+
+import protocol
+from netcode import INPUT_KEEPALIVE_TICKS, SendRateController, SnapshotHistory
+from simulation import PlayerInput, Simulation
+
+MAX_PLAYERS = 8
+MAX_SPECTATORS = 32
+MAP_PREVIEW_KEEPALIVE = 1.0  # 맵 선택 미리보기: 바뀔 때 + 이 간격으로만 재전송
+
+
+def _next_timer(timer: float, interval: float) -> float:
+    # 주기만큼만 빼서 초과분을 다음 전송으로 넘김 (0으로 리셋하면 프레임 dt가 고르지 않을 때 실제 주기가 목표보다 낮아짐)
+    # 오래 멈췄다 재개해도 한꺼번에 몰아서 보내지 않도록 한 주기 이내로 제한
+    return min(max(0.0, timer - interval), interval)
+
+
+class Peer:
+    """원격 플레이어 1명"""
+
+    def __init__(self, index: int, conn, rate: SendRateController):
+        self.index = index
+        self.conn = conn
+        self.ip = conn.peer[0] if conn.peer else None
+        self.udp_addr = None
+        self.state_ack: int | None = None  # client가 마지막으로 복원한 state seq
+        self.rate = rate  # 이 peer로 보내는 state 주기
+        self.state_timer = 0.0
+        # 마지막 input을 받은 뒤 진행한 틱 수 (그동안은 같은 입력을 적용)
+        self.held_ticks = 0
+        # UDP input 손실률: 받은 메시지 수 / 메시지 번호(n)로 본 보낸 수
+        self._last_n: int | None = None
+        self._rx = 0
+        self._expected = 0
+        self._coalesced = 0
+        # 마지막으로 받아들인 emote의 emote_seq (client가 ack 전까지 재전송하는 같은 emote는 한 번만 적용)
+        self.emote_seq = 0
+        self.input = {
+            "throttle": False,
+            "brake": False,
+            "left": False,
+            "right": False,
+            "boost": False,
+            "emote_req": 0,
+            "seq": 0,
+        }
+
+    @property
+    def connected(self) -> bool:
+        return not self.conn.closed
+
+    def on_input(self, obj: dict, udp: bool = False):
+        # UDP로 뒤늦게 도착한 오래된 입력은 무시
+        seq = obj.get("seq")
+        if seq is not None and seq <= self.input.get("seq", 0):
+            return
+
+        n = obj.get("n")
+        if udp and n is not None:
+            # TCP는 유실이 없고 latest_only로 건너뛰는 것도 있으므로 UDP로 받은 것만 계산
+            if self._last_n is not None and n > self._last_n:
+                self._rx += 1
+                self._expected += n - self._last_n
+            self._last_n = n
+
+        emote = int(obj.get("emote_req", 0))
+        if emote:
+            emote_seq = int(obj.get("emote_seq", seq or 0))
+            if emote_seq <= self.emote_seq:
+                emote = 0  # 이미 받아들인 emote의 재전송
+            else:
+                self.emote_seq = emote_seq
+
+        # seq까지 한 dict에 담아 통째로 교체 (입력/seq를 짝 맞춰 읽도록)
+        self.input = {
+            "throttle": bool(obj.get("throttle")),
+            "brake": bool(obj.get("brake")),
+            "left": bool(obj.get("left")),
+            "right": bool(obj.get("right")),
+            "boost": bool(obj.get("boost")),
+            # emote는 1회성이므로 아직 적용 안 된 요청을 덮어쓰지 않음
+            "emote_req": emote or self.input.get("emote_req", 0),
+            "seq": seq if seq is not None else self.input.get("seq", 0),
+        }
+        if obj.get("ack") is not None:
+            self.state_ack = int(obj["ack"])
+        self.held_ticks = 0
+
+    def applied_seq(self, max_held: int) -> int:
+        """
+        host가 마지막 틱에 적용한 input seq (state acks로 전송)
+        - client는 틱마다 seq를 올리지만 입력이 바뀔 때만 보냄 → 받은 입력을 계속 적용한 틱만큼 seq를 앞당김
+        - keep-alive 간격(max_held틱)보다 오래 안 오면 유실로 보고 더 앞당기지 않음
+        """
+        return self.input.get("seq", 0) + max(0, min(self.held_ticks, max_held) - 1)
+
+    def take_loss(self) -> float | None:
+        """지난 호출 이후 UDP input 손실률 (받은 게 없으면 None)"""
+        if self._expected <= 0:
+            return None
+        loss = 1.0 - self._rx / self._expected
+        self._rx = self._expected = 0
+        return max(0.0, loss)
+
+    def clear_input(self):
+        # 연결이 끊긴 플레이어의 차는 그 자리에 멈춤
+        self.input = dict(self.input, throttle=False, brake=False, left=False, right=False, boost=False, emote_req=0)
+
+
+class RoomHost:
+    """
+    authoritative 방 1개:
+    - poll(): 새 접속 배정(accepting일 때만), 모든 연결/UDP inbox 처리
+    - advance(dt, local_inputs): 로컬 + 원격 입력으로 Simulation 진행, peer별 전송 주기에 맞춰 state 전송
+    - votes: 플레이어별 리매치 투표, vote_result()/finish_vote()로 다음 판 결정
+    """
+
+    def __init__(
+        self,
+        transport,
+        sim: Simulation,
+        port: int,
+        room_id: str,
+        room_name: str,
+        local_players: int = 1,
+        max_players: int = MAX_PLAYERS,
+        binary: bool = True,
+        udp: bool = True,
+        state_send_rate: float = 30.0,
+        min_state_rate: float = 10.0,
+        spectator_rate: float = 10.0,
+        max_spectators: int = MAX_SPECTATORS,
+    ):
+        self.transport = transport
+        self.sim = sim
+        self.port = port
+        self.room_id = room_id
+        self.room_name = room_name
+        self.local_players = local_players
+        self.max_players = max_players
+        self.use_udp = udp
+        self.state_send_rate = state_send_rate  # peer별 state 주기 상한 (링크가 나쁘면 min_state_rate까지 낮춤)
+        self.min_state_rate = min(min_state_rate, state_send_rate)
+        self.spectator_rate = spectator_rate
+        self.max_spectators = max_spectators
+
+        # 접속 후 join(역할)을 아직 안 보냈거나, 레이스 중이라 배정을 기다리는 연결
+        self._pending: list = []
+        self.spectators: list = []  # transport.Connection
+        self._spectator_timer = 0.0
+        self._match_map: int | None = None  # 진행 중인 판의 맵 (중간 입장 관전자용)
+
+        self.peers: list[Peer] = []
+        self.accepting = True  # 레이스 중에는 새 접속을 대기열에 둠
+        self.votes: list[bool | None] = [None] * self.num_players
+
+        self.snapshots = SnapshotHistory()
+        # client가 input을 안 보내도 같은 입력이 이어진다고 보는 최대 틱 수 (keep-alive + 여유)
+        self._max_held_ticks = INPUT_KEEPALIVE_TICKS + 2
+        self._preview_map: int | None = None
+        self._preview_sent = 0.0
+
+        self.udp = None
+        self._udp_peers: dict[tuple, Peer] = {}
+
+        # 한 번에 도착한 input 중 가장 최신 것만 디코딩
+        self.listener = transport.listen(
+            port, binary=binary, latest_only=("input",), backlog=max_players + max_spectators
+        )
+        # 검색 질의 응답용 (상태가 바뀔 때마다 _update_announce()로 갱신)
+        self.announcer = transport.announce(room_id, room_name, port)
+        self._announced = None
+        self._update_announce()
+
+    @property
+    def num_players(self) -> int:
+        return self.local_players + len(self.peers)
+
+    def queue_stats(self) -> dict | None:
+        """모든 연결 송신 큐 합계 (HUD 표시용)"""
+        stats = [p.conn.queue_stats() for p in self.peers if p.connected]
+        if not stats:
+            return None
+        return {
+            "depth": sum(s["depth"] for s in stats),
+            "bytes": sum(s["bytes"] for s in stats),
+            "max_depth": max(s["max_depth"] for s in stats),
+            "coalesced": sum(s["coalesced"] for s in stats),
+        }
+
+    # -----------------------------
+    # Network inbox
+    # -----------------------------
+    def poll(self):
+        if self.accepting:
+            # 로비에서 나간 플레이어는 바로 빼서 자리/차 수/광고 인원을 맞춤 (레이스 중에는 차가 그 자리에 멈춤)
+            self._prune_disconnected()
+        self._accept_pending()
+
+        for peer in self.peers:
+            inbox = peer.conn.inbox
+            while inbox:
+                self._on_peer_message(peer, inbox.popleft())
+            if not peer.connected:
+                peer.clear_input()
+
+        # 관전자는 보낼 게 없음 (hb는 transport가 처리) → 받은 건 버리고 끊긴 연결 정리
+        for conn in self.spectators:
+            conn.inbox.clear()
+        self.spectators = [c for c in self.spectators if not c.closed]
+
+        if self.udp is not None:
+            inbox = self.udp.inbox
+            while inbox:
+                obj, addr = inbox.popleft()
+                peer = self._udp_peers.get(addr)
+                if peer is not None and obj.get("type") == "input":
+                    peer.on_input(obj, udp=True)
+
+        self._update_announce()
+
+    def _prune_disconnected(self):
+        if all(p.connected for p in self.peers):
+            return
+        votes = self.votes[: self.local_players]
+        staying = []
+        for peer in self.peers:
+            if peer.connected:
+                staying.append(peer)
+                votes.append(self.votes[peer.index] if peer.index < len(self.votes) else None)
+            elif peer.udp_addr is not None:
+                self._udp_peers.pop(peer.udp_addr, None)
+        self.peers = staying
+        self.votes = votes
+        self._reindex()
+        self._send_welcome()
+
+    def _reindex(self):
+        for i, peer in enumerate(self.peers):
+            peer.index = self.local_players + i
+
+    def _update_announce(self):
+        # 검색 응답에 싣는 실시간 방 상태 (바뀐 경우에만 announcer에 반영)
+        status = {
+            "players": self.local_players + sum(1 for p in self.peers if p.connected),
+            "max_players": self.max_players,
+            "spectators": len(self.spectators),
+            "map": self.sim.map_id,
+            "in_race": not self.accepting,
+        }
+        if status != self._announced:
+            self._announced = status
+            self.announcer.set_status(**status)
+
+    def _accept_pending(self):
+        accepted = self.listener.accepted
+        while accepted:
+            self._pending.append(accepted.popleft())
+
+        waiting = []
+        for conn in self._pending:
+            if conn.closed:
+                continue
+            role = getattr(conn, "role_req", None)
+            while role is None and conn.inbox:
+                obj = conn.inbox.popleft()
+                if obj.get("type") == "join":
+                    role = conn.role_req = obj.get("role", "player")
+            if role is None:
+                waiting.append(conn)
+            elif role == "spectator":
+                self._add_spectator(conn)
+            elif not self.accepting:
+                # 레이스 중 접속한 플레이어는 다음 판 로비까지 대기
+                waiting.append(conn)
+            elif self.num_players >= self.max_players:
+                conn.send({"type": "reject", "reason": "room full"})
+                conn.close()
+            else:
+                rate = SendRateController(self.min_state_rate, self.state_send_rate)
+                self.peers.append(Peer(self.num_players, conn, rate))
+                self.votes.append(None)
+                self._send_welcome()
+        self._pending = waiting
+
+    def _add_spectator(self, conn):
+        if len(self.spectators) >= self.max_spectators:
+            conn.send({"type": "reject", "reason": "too many spectators"})
+            conn.close()
+            return
+        self.spectators.append(conn)
+        conn.send({"type": "welcome", "spectator": True, "players": self.num_players})
+        if self._match_map is not None:
+            # 레이스 중간에 들어오면 맵/차량 수부터 맞춘 뒤 state 스트림 수신
+            conn.send({"type": "map_select", "map": self._match_map, "players": self.num_players, "start": True})
+
+    def _send_welcome(self):
+        # 접속/퇴장으로 인덱스가 바뀔 수 있으므로 전원에게 다시 알림
+        for peer in self.peers:
+            peer.conn.send({"type": "welcome", "player": peer.index, "players": self.num_players})
+
+    def _on_peer_message(self, peer: Peer, obj: dict):
+        t = obj.get("type")
+        if t == "input":
+            peer.on_input(obj)
+        elif t == "rematch_vote":
+            self.set_vote(peer.index, obj.get("vote"))
+        elif t == "udp_hello" and self.use_udp:
+            # client UDP 주소 등록 후 host UDP 포트 알려줌
+            if self.udp is None:
+                self.udp = self.transport.open_udp(self.port)
+            if peer.udp_addr is not None:
+                self._udp_peers.pop(peer.udp_addr, None)
+            peer.udp_addr = (peer.ip, int(obj.get("port", 0)))
+            self._udp_peers[peer.udp_addr] = peer
+            peer.conn.send({"type": "udp_hello", "port": self.udp.port})
+
+    # -----------------------------
+    # Match flow
+    # -----------------------------
+    def send_map_select(self, map_id: int, start: bool = False):
+        """맵 선택 화면에서 매 프레임 호출해도 됨 (미리보기는 바뀔 때 + keep-alive 간격으로만 전송)"""
+        now = time.monotonic()
+        if not start and map_id == self._preview_map and now - self._preview_sent < MAP_PREVIEW_KEEPALIVE:
+            return
+        self._preview_map = None if start else map_id
+        self._preview_sent = now
+
+        msg = {"type": "map_select", "map": map_id, "players": self.num_players}
+        if start:
+            msg["start"] = True
+            self._match_map = map_id
+        self.broadcast(msg)
+
+    def start_match(self):
+        """map 선택 완료 후 호출: 차량 수 확정 + 레이스 중 접속 보류 + 투표 초기화"""
+        self.accepting = False
+        self.sim.set_num_players(self.num_players)
+        self.votes = [None] * self.num_players
+        self._spectator_timer = 0.0
+        for peer in self.peers:
+            peer.state_ack = None
+            peer.state_timer = 0.0
+            peer.held_ticks = 0
+
+    def advance(self, dt: float, local_inputs: list[PlayerInput]) -> int:
+        inputs = list(local_inputs[: self.local_players])
+        inputs += [PlayerInput()] * (self.local_players - len(inputs))
+        inputs += [PlayerInput.from_dict(p.input) for p in self.peers]
+
+        steps = self.sim.advance(dt, inputs)
+        if steps > 0:
+            # 1회성 입력(emote)은 적용됐으므로 소비
+            for peer in self.peers:
+                peer.held_ticks += steps
+                if peer.input.get("emote_req"):
+                    peer.input["emote_req"] = 0
+
+        self._spectator_timer += dt
+        for peer in self.peers:
+            peer.state_timer += dt
+            if peer.rate.due(dt):
+                self._update_rate(peer)
+        if steps == 0:
+            return steps
+
+        # 주기가 된 peer에게만 (같은 스냅샷을 baseline별로 묶어 한 번씩 인코딩)
+        due = [p for p in self.peers if p.connected and p.state_timer >= 1.0 / p.rate.rate]
+        state = None
+        if due:
+            for peer in due:
+                peer.state_timer = _next_timer(peer.state_timer, 1.0 / peer.rate.rate)
+            state = self._build_state()
+            self.broadcast_state(state, due)
+
+        if self.spectators and self._spectator_timer >= 1.0 / self.spectator_rate:
+            self._spectator_timer = _next_timer(self._spectator_timer, 1.0 / self.spectator_rate)
+            self.broadcast_spectators(state or self._build_state())
+        return steps
+
+    def _build_state(self) -> dict:
+        # acks: 차량별로 마지막 틱에 실제로 적용한 input seq (로컬 플레이어는 0)
+        # clock: sim.time이 host 시계로 언제였는지 (client가 ping/pong offset으로 자기 시계에 맞춤)
+        state = {"server_time": self.sim.time, "clock": time.monotonic() - self.sim.lag}
+        state.update(self.sim.snapshot())
+        state["acks"] = [0] * self.local_players + [p.applied_seq(self._max_held_ticks) for p in self.peers]
+        return state
+
+    def _update_rate(self, peer: Peer):
+        # 송신 큐에 쌓였거나 보내기 전에 state가 덮어써졌으면 (TCP 송신 버퍼가 참) 적체
+        stats = peer.conn.queue_stats()
+        congested = stats["depth"] >= 4 or stats["coalesced"] > peer._coalesced
+        peer._coalesced = stats["coalesced"]
+        peer.rate.update(peer.conn.remote_rtt, peer.take_loss(), congested)
+
+    def state_rates(self) -> list[float]:
+        """peer별 현재 state 전송 주기 (HUD 표시용)"""
+        return [p.rate.rate for p in self.peers if p.connected]
+
+    def broadcast_state(self, state: dict, peers: list[Peer]):
+        self.snapshots.push(state)
+
+        # 같은 baseline이면 같은 메시지 → 전송 경로/포맷별로 한 번만 인코딩
+        messages: dict = {}
+        encoded: dict = {}
+        for peer in peers:
+            if not peer.connected:
+                continue
+            base = self.snapshots.baseline_for(peer.state_ack)
+            msg = messages.get(base)
+            if msg is None:
+                msg = messages[base] = self.snapshots.message_for(base)
+
+            if self.udp is not None and peer.udp_addr is not None:
+                key = ("udp", base)
+                data = encoded.get(key)
+                if data is None:
+                    data = encoded[key] = protocol.encode_message(msg)
+                if self.udp.sendto(data, peer.udp_addr):
+                    continue
+
+            key = (peer.conn.wire, base)
+            data = encoded.get(key)
+            if data is None:
+                data = encoded[key] = peer.conn.codec.encode(msg)
+            peer.conn.send_encoded(data, "state")
+
+    def broadcast_spectators(self, state: dict):
+        # 관전자는 ack를 보내지 않으므로 delta 없이 전체 state (seq 없음 → 받은 그대로 사용)
+        msg = {k: v for k, v in state.items() if k != "acks"}
+        msg["type"] = "state"
+        self._send_all(self.spectators, msg)
+
+    def broadcast(self, msg: dict, spectators: bool = True):
+        conns = [p.conn for p in self.peers]
+        if spectators:
+            conns += self.spectators
+        self._send_all(conns, msg)
+
+    def _send_all(self, conns, msg: dict):
+        # wire 포맷별로 한 번만 인코딩한 bytes를 각 연결 송신 큐에 넣음
+        encoded: dict = {}
+        for conn in conns:
+            if conn.closed:
+                continue
+            data = encoded.get(conn.wire)
+            if data is None:
+                data = encoded[conn.wire] = conn.codec.encode(msg)
+            conn.send_encoded(data, msg.get("type"))
+
+    # -----------------------------
+    # Rematch vote
+    # -----------------------------
+    def set_vote(self, index: int, vote: bool | None):
+        if 0 <= index < len(self.votes) and self.votes[index] != vote:
+            self.votes[index] = vote
+            self.broadcast({"type": "votes", "votes": list(self.votes)})
+
+    def _voters(self) -> list[int]:
+        # 연결이 끊긴 플레이어는 기다리지 않음
+        return list(range(self.local_players)) + [p.index for p in self.peers if p.connected]
+
+    def vote_result(self) -> str | None:
+        """
+        모든 (접속 중인) 플레이어가 투표했으면 "restart" / "quit", 아직이면 None
+        - 로컬(host) 플레이어가 NO면 방 종료
+        - 원격 플레이어 NO는 그 플레이어만 퇴장, 남은 원격 플레이어가 없으면 종료
+        """
+        voters = self._voters()
+        if any(self.votes[i] is None for i in voters):
+            return None
+        if any(self.votes[i] is False for i in range(self.local_players)):
+            return "quit"
+        if not any(self.votes[p.index] for p in self.peers if p.connected):
+            return "quit"
+        return "restart"
+
+    def finish_vote(self, action: str):
+        """결과 전송 + restart면 NO/끊긴 플레이어를 빼고 인덱스를 다시 매김"""
+        staying = []
+        for peer in self.peers:
+            keep = action == "restart" and peer.connected and self.votes[peer.index]
+            if peer.connected:
+                peer.conn.send({"type": "match_result", "action": "restart" if keep else "quit"})
+            if keep:
+                staying.append(peer)
+            else:
+                if peer.udp_addr is not None:
+                    self._udp_peers.pop(peer.udp_addr, None)
+                peer.conn.close()
+
+        self.peers = staying
+        self._reindex()
+        self.votes = [None] * self.num_players
+        self.accepting = True
+        self._match_map = None
+        if action == "restart":
+            self._send_welcome()
+        # 관전자는 방이 닫힐 때까지 남아서 다음 판을 기다림
+        self._send_all(self.spectators, {"type": "match_result", "action": "restart"})
+
+    # -----------------------------
+    # Cleanup
+    # -----------------------------
+    def close(self):
+        self.announcer.close()
+        self._send_all(self.spectators, {"type": "match_result", "action": "quit"})
+        for conn in [p.conn for p in self.peers] + self.spectators + self._pending:
+            conn.close()
+        if self.udp is not None:
+            self.udp.close()
+        self.listener.close()
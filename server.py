@@ -0,0 +1,207 @@
+# server.py
+"""
+헤드리스 전용 서버 (디스플레이 / 믹서 / 폰트 없이 방 여러 개 동시 운영):
+- 방 N개를 워커 프로세스 W개에 나눠 배치 (방 k → 워커 k % W, 포트 base_port + k)
+- 워커 1개 = Transport 이벤트 루프 1개 + 방별 틱 스케줄러 (다음 틱 시각이 가장 이른 방부터 진행)
+- 각 방은 RoomHost(local_players=0)로 동작하고 기존 방 광고(room_announce)로 검색 목록에 표시
+- 진행: 로비(min_players 모이면 lobby_wait초 뒤 출발) → 레이스 → 결과/투표(vote_timeout) → 로비
+- 관전자는 언제든 입장 가능 (spectator_rate 주기로 state만 수신, 플레이어 수에는 포함 안 됨)
+
+사용 예) python server.py --rooms 8 --workers 4 --base-port 5000
+"""
+import argparse
+import heapq
+import multiprocessing
+import os
+import signal
+import time
+
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+
+from room import MAX_PLAYERS, RoomHost
+from simulation import Simulation
+from transport import Transport
+
+
+class ServerRoom:
+    """
+    방 1개의 진행 상태 (host 화면의 로비/맵 선택/투표 키 입력을 타이머로 대체):
+    - lobby: 접속 대기 (나간 플레이어는 room.poll()이 바로 정리), min_players 이상이면 lobby_wait초 뒤 다음 맵으로 출발
+    - race: 로컬 플레이어 없이 원격 입력만으로 Simulation 진행
+    - result: 승자 확정 후 전원 투표 또는 vote_timeout초가 지나면 restart / 로비 복귀
+    """
+
+    def __init__(self, transport, port, room_id, room_name, args):
+        self.sim = Simulation(0, num_players=0)
+        self.room = RoomHost(
+            transport,
+            self.sim,
+            port,
+            room_id,
+            room_name,
+            local_players=0,
+            max_players=args.max_players,
+            binary=args.wire == "binary",
+            udp=not args.no_udp,
+            state_send_rate=args.state_rate,
+            min_state_rate=args.min_state_rate,
+            spectator_rate=args.spectator_rate,
+        )
+        self.room_id = room_id
+        self.min_players = args.min_players
+        self.lobby_wait = args.lobby_wait
+        self.vote_timeout = args.vote_timeout
+
+        self.phase = "lobby"
+        self.phase_since = time.monotonic()
+        self.ready_since: float | None = None
+        self.next_map = 0
+        self.num_maps = len(self.sim.track.MAP_DATA)
+
+    def _set_phase(self, phase: str):
+        self.phase = phase
+        self.phase_since = time.monotonic()
+
+    def tick(self, dt: float):
+        now = time.monotonic()
+        self.room.poll()
+
+        if self.phase == "lobby":
+            connected = sum(1 for p in self.room.peers if p.connected)
+            if connected < self.min_players:
+                self.ready_since = None
+            elif self.ready_since is None:
+                self.ready_since = now
+            elif now - self.ready_since >= self.lobby_wait:
+                self._start_race()
+            return
+
+        if self.phase == "race":
+            if not any(p.connected for p in self.room.peers):
+                # 전원 퇴장: 로비로
+                self.room.finish_vote("quit")
+                self._set_phase("lobby")
+                return
+            self.room.advance(dt, [])
+            if self.sim.winner is not None:
+                print(f"[{self.room_id}] winner {self.sim.winner}")
+                self._set_phase("result")
+            return
+
+        if self.phase == "result":
+            action = self.room.vote_result()
+            if action is None and now - self.phase_since >= self.vote_timeout:
+                # 시간 안에 투표하지 않은 플레이어는 NO로 처리
+                for i, v in enumerate(self.room.votes):
+                    if v is None:
+                        self.room.votes[i] = False
+                action = self.room.vote_result()
+            if action is None:
+                return
+            self.room.finish_vote(action)
+            if action == "restart":
+                # 레이스 중 접속해서 대기하던 플레이어를 이번 판에 합류시킨 뒤 출발
+                # (finish_vote로 accepting이 켜진 상태에서 poll해야 배정됨, start_match가 다시 끔)
+                self.room.poll()
+                self._start_race()
+            else:
+                self._set_phase("lobby")
+
+    def _start_race(self):
+        self.sim.load_map(self.next_map)
+        self.room.send_map_select(self.next_map, start=True)
+        print(f"[{self.room_id}] race on map {self.next_map + 1} with {self.room.num_players} players")
+        self.next_map = (self.next_map + 1) % self.num_maps
+
+        self.room.start_match()
+        self.sim.reset_match(spawn_items=True)
+        self.ready_since = None
+        self._set_phase("race")
+
+    def close(self):
+        self.room.close()
+
+
+def _raise_interrupt(signum, frame):
+    # SIGTERM도 Ctrl+C와 같은 경로로 정리 (finally에서 방/포트 닫기)
+    raise KeyboardInterrupt
+
+
+def run_worker(room_specs, args):
+    """워커 프로세스: 배정된 방들을 하나의 이벤트 루프 + 틱 스케줄러로 운영"""
+    signal.signal(signal.SIGTERM, _raise_interrupt)
+    transport = Transport()
+    rooms = [ServerRoom(transport, port, rid, name, args) for rid, name, port in room_specs]
+    for (rid, _name, port) in room_specs:
+        print(f"[{rid}] listening on {port} (pid {os.getpid()})")
+
+    tick = 1.0 / args.tick_rate
+    start = time.monotonic()
+    # (다음 틱 시각, 방 번호, 마지막 틱 시각): 방마다 시작 시점을 조금씩 어긋나게 해서 틱이 몰리지 않도록
+    schedule = [(start + tick * i / len(rooms), i, start) for i in range(len(rooms))]
+    heapq.heapify(schedule)
+
+    try:
+        while True:
+            due, i, last = heapq.heappop(schedule)
+            now = time.monotonic()
+            if due > now:
+                time.sleep(due - now)
+                now = time.monotonic()
+
+            rooms[i].tick(now - last)
+
+            # 많이 밀렸으면 따라잡지 않고 다음 틱부터 (Simulation도 최대 틱 수를 제한)
+            nxt = due + tick
+            if nxt < now:
+                nxt = now + tick
+            heapq.heappush(schedule, (nxt, i, now))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for r in rooms:
+            r.close()
+        transport.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="2D Racing headless room server")
+    parser.add_argument("--rooms", type=int, default=4)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--base-port", type=int, default=5000)
+    parser.add_argument("--name", default="Server")
+    parser.add_argument("--max-players", type=int, default=MAX_PLAYERS)
+    parser.add_argument("--min-players", type=int, default=2)
+    parser.add_argument("--lobby-wait", type=float, default=5.0)
+    parser.add_argument("--vote-timeout", type=float, default=20.0)
+    parser.add_argument("--tick-rate", type=float, default=60.0)
+    parser.add_argument("--state-rate", type=float, default=30.0)
+    parser.add_argument("--min-state-rate", type=float, default=10.0)
+    parser.add_argument("--spectator-rate", type=float, default=10.0)
+    parser.add_argument("--wire", choices=("binary", "json"), default="binary")
+    parser.add_argument("--no-udp", action="store_true")
+    args = parser.parse_args()
+
+    workers = max(1, min(args.workers, args.rooms))
+    specs = [[] for _ in range(workers)]
+    for k in range(args.rooms):
+        specs[k % workers].append((f"SRV{k + 1:02d}", f"{args.name} {k + 1}", args.base_port + k))
+
+    procs = [multiprocessing.Process(target=run_worker, args=(s, args), daemon=True) for s in specs]
+    for p in procs:
+        p.start()
+    # kill -TERM으로 부모만 종료돼도 워커가 남아 포트를 잡고 있지 않도록
+    signal.signal(signal.SIGTERM, _raise_interrupt)
+    try:
+        for p in procs:
+            p.join()
+    except KeyboardInterrupt:
+        for p in procs:
+            if p.is_alive():
+                p.terminate()
+        for p in procs:
+            p.join(5.0)
+
+
+if __name__ == "__main__":
+    main()
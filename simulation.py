@@ -0,0 +1,453 @@
+# simulation.py
+import math
+import random
+from dataclasses import dataclass
+
+import pygame
+
+from car import Car
+from track import Track
+
+
+# -----------------------------
+# Item (cyan pickup)
+# -----------------------------
+class Item:
+    def __init__(self, x: int, y: int):
+        self.rect = pygame.Rect(int(x), int(y), 16, 16)
+        self.color = (0, 255, 255)
+
+    def draw(self, screen: pygame.Surface) -> pygame.Rect:
+        return pygame.draw.rect(screen, self.color, self.rect, border_radius=4)
+
+
+# -----------------------------
+# Per-player input
+# -----------------------------
+@dataclass
+class PlayerInput:
+    throttle: bool = False
+    brake: bool = False
+    left: bool = False
+    right: bool = False
+    boost: bool = False
+    emote_req: int = 0
+
+    @classmethod
+    def from_keys(cls, keys, keymap: dict, emote_req: int = 0) -> "PlayerInput":
+        return cls(
+            throttle=bool(keys[keymap["throttle"]]),
+            brake=bool(keys[keymap["brake"]]),
+            left=bool(keys[keymap["left"]]),
+            right=bool(keys[keymap["right"]]),
+            boost=bool(keys[keymap["boost"]]),
+            emote_req=int(emote_req),
+        )
+
+    @classmethod
+    def from_dict(cls, d: dict) -> "PlayerInput":
+        return cls(
+            throttle=bool(d.get("throttle")),
+            brake=bool(d.get("brake")),
+            left=bool(d.get("left")),
+            right=bool(d.get("right")),
+            boost=bool(d.get("boost")),
+            emote_req=int(d.get("emote_req", 0)),
+        )
+
+    def to_dict(self) -> dict:
+        return {
+            "throttle": self.throttle,
+            "brake": self.brake,
+            "left": self.left,
+            "right": self.right,
+            "boost": self.boost,
+            "emote_req": self.emote_req,
+        }
+
+
+# P1, P2 ... 차량 색상 (body, nose)
+CAR_COLORS = [
+    ((230, 230, 230), (255, 80, 80)),
+    ((120, 160, 255), (255, 255, 80)),
+    ((255, 140, 60), (40, 40, 40)),
+    ((120, 220, 120), (255, 255, 255)),
+    ((220, 110, 220), (255, 255, 80)),
+    ((250, 220, 70), (60, 60, 200)),
+    ((90, 220, 220), (255, 80, 80)),
+    ((170, 120, 80), (255, 255, 255)),
+]
+
+
+class Simulation:
+    """
+    헤드리스 레이스 시뮬레이션:
+    - 디스플레이 / pygame.time.Clock 없이 동작 (pygame.Rect만 사용)
+    - Car, Track, 아이템, 체크포인트 진행도, 승자, 카운트다운 상태를 소유
+    - step(inputs)는 고정 dt 만큼 한 틱 진행, advance(elapsed, inputs)는 누적기 기반
+    - 시간은 self.time(시뮬레이션 시계)을 사용하므로 벽시계보다 빠르게 돌릴 수 있음
+    """
+
+    DT = 1.0 / 60.0
+    MAX_STEPS_PER_ADVANCE = 5
+
+    # 출발 줄 간격(px) / 스폰 자리가 막혔을 때 앞으로 찾아볼 줄 수
+    SPAWN_GAP = 30
+    SPAWN_SEARCH_ROWS = 4
+
+    def __init__(
+        self,
+        map_id: int = 0,
+        num_players: int = 2,
+        width: int = 900,
+        height: int = 600,
+        seed: int | None = None,
+        dt: float = DT,
+    ):
+        self.dt = float(dt)
+        self.width = width
+        self.height = height
+        self.rng = random.Random(seed)  # 아이템 스폰용 (seed 고정 시 재현 가능)
+        self.time = 0.0
+        self._accum = 0.0
+
+        # -----------------------------
+        # Track / Map
+        # -----------------------------
+        self.map_id = 0
+        self.track = Track(map_id)
+
+        # -----------------------------
+        # Cars
+        # -----------------------------
+        self.cars: list[Car] = []
+        self.cp_indices: list[int] = []
+        self.set_num_players(num_players)
+
+        # -----------------------------
+        # Race state
+        # -----------------------------
+        self.winner: str | None = None
+
+        # 카운트다운 (시뮬레이션 시계 기준)
+        self.countdown_total = 3.0
+        self.show_go_time = 0.6
+        self.start_at: float | None = None
+        self.go_until: float | None = None
+        self.race_started = False
+
+        # 아이템 / 부스트
+        self.items: list[Item] = []
+        self.item_spawn_timer = 0.0
+        self.ITEM_SPAWN_INTERVAL = 5.0
+        self.MAX_ITEMS = 5
+
+        # 차 간 충돌 on/off
+        self.car_collision = True
+
+        self.load_map(map_id)
+
+    # -----------------------------
+    # Map / reset
+    # -----------------------------
+    def load_map(self, map_id: int):
+        self.track.load_map(map_id)
+        self.map_id = map_id if 0 <= map_id < len(self.track.MAP_DATA) else 0
+        self.reset_car_positions()
+
+    def set_num_players(self, n: int):
+        """차량 수 변경 (기존 차는 유지, 부족하면 추가 / 넘치면 제거). 위치는 reset_match에서 정렬"""
+        while len(self.cars) < n:
+            i = len(self.cars)
+            body, nose = CAR_COLORS[i % len(CAR_COLORS)]
+            self.cars.append(Car(300 + 50 * i, 540, body_color=body, nose_color=nose))
+        del self.cars[n:]
+        self.cp_indices = (self.cp_indices + [0] * n)[:n]
+
+    def reset_car_positions(self):
+        angle = self.track.spawn_angle
+        taken: list[pygame.Rect] = []
+
+        for i, car in enumerate(self.cars):
+            car.x, car.y = self._spawn_slot(i, taken)
+            taken.append(car.get_aabb_rect())
+            car.speed = 0
+            car.angle = angle
+
+            # 아이템/부스트 상태 초기화
+            car.has_item = False
+            car.boost_timer = 0.0
+
+            # emote 초기화
+            car.emote_id = 0
+            car.emote_timer = 0.0
+
+    def _spawn_slot(self, i: int, taken: list[pygame.Rect]) -> tuple[float, float]:
+        """
+        i번째 차의 출발 위치:
+        - 스폰 지점보다 차가 많으면 같은 지점 뒤쪽(출발 방향 반대)으로 SPAWN_GAP 간격으로 줄 세움
+        - 그 자리가 벽/화면 밖이거나 먼저 놓인 차와 겹치면 같은 줄 옆 → 한 줄 앞 순서로 빈 자리를 찾음
+        """
+        sp = self.track.spawn_points
+        angle = self.track.spawn_angle
+        fx, fy = math.cos(angle), math.sin(angle)  # 출발 방향
+        sx, sy = -fy, fx  # 옆 방향
+
+        bx, by = sp[i % len(sp)]
+        row = i // len(sp)
+        gap = self.SPAWN_GAP
+        bounds = pygame.Rect(0, 0, self.width, self.height)
+        probe = self.cars[i].get_aabb_rect()
+
+        for r in range(row, row - self.SPAWN_SEARCH_ROWS, -1):
+            for side in (0, 1, -1, 2, -2, 3, -3):
+                x = bx - fx * gap * r + sx * gap * side
+                y = by - fy * gap * r + sy * gap * side
+                probe.topleft = (int(x - probe.w / 2), int(y - probe.h / 2))
+                if (
+                    bounds.contains(probe)
+                    and not self.track.collides_with_walls(probe)
+                    and probe.collidelist(taken) == -1
+                ):
+                    return x, y
+
+        # 빈 자리가 없으면 원래 줄 자리 (맵 데이터가 잘못된 경우)
+        return bx - fx * gap * row, by - fy * gap * row
+
+    def reset_match(self, spawn_items: bool = True):
+        self.cp_indices = [0] * len(self.cars)
+        self.winner = None
+
+        self.start_at = None
+        self.go_until = None
+        self.race_started = False
+        self._accum = 0.0
+
+        self.reset_car_positions()
+
+        self.items = []
+        self.item_spawn_timer = 0.0
+        if spawn_items:
+            self._spawn_initial_items()
+
+    def _spawn_initial_items(self):
+        for _ in range(self.MAX_ITEMS):
+            self._spawn_item()
+
+    def _spawn_item(self):
+        pos = self.track.get_random_safe_point(self.width, self.height, 16, 16, rng=self.rng)
+        if pos:
+            self.items.append(Item(pos[0], pos[1]))
+
+    # -----------------------------
+    # Stepping
+    # -----------------------------
+    def advance(self, elapsed: float, inputs: list[PlayerInput]) -> int:
+        """
+        elapsed(벽시계 dt)를 누적해 고정 dt 단위로 step.
+        emote_req 같은 1회성 입력은 첫 틱에만 적용. 실행한 틱 수를 반환.
+        """
+        self._accum += elapsed
+        steps = 0
+        while self._accum >= self.dt and steps < self.MAX_STEPS_PER_ADVANCE:
+            self.step(inputs)
+            if steps == 0:
+                inputs = [
+                    PlayerInput(i.throttle, i.brake, i.left, i.right, i.boost, 0)
+                    for i in inputs
+                ]
+            self._accum -= self.dt
+            steps += 1
+
+        # 너무 밀렸으면(창 드래그 등) 따라잡지 않고 버림
+        if steps >= self.MAX_STEPS_PER_ADVANCE:
+            self._accum = min(self._accum, self.dt)
+        return steps
+
+    @property
+    def lag(self) -> float:
+        """advance()가 아직 틱으로 진행하지 않은 누적 시간 (self.time은 그만큼 벽시계보다 뒤)"""
+        return self._accum
+
+    def step(self, inputs: list[PlayerInput]):
+        dt = self.dt
+        self.time += dt
+
+        # 감정표현 만료 (시뮬레이션 시계 기준이라 draw를 안 하는 헤드리스 서버에서도 꺼짐)
+        for car in self.cars:
+            car.update_emote(dt)
+
+        if self.winner is not None:
+            return
+
+        # 감정표현은 카운트다운 중에도 적용
+        for car, inp in zip(self.cars, inputs):
+            if inp.emote_req > 0:
+                car.set_emote(inp.emote_req)
+
+        # 아이템 주기적 생성
+        self.item_spawn_timer += dt
+        if self.item_spawn_timer >= self.ITEM_SPAWN_INTERVAL:
+            self.item_spawn_timer = 0.0
+            if len(self.items) < self.MAX_ITEMS:
+                self._spawn_item()
+
+        # 카운트다운 게이트: 출발 전에는 움직임 적용하지 않음
+        if self.start_at is None:
+            self.start_at = self.time + self.countdown_total
+        if not self.race_started:
+            if self.time >= self.start_at:
+                self.race_started = True
+                self.go_until = self.time + self.show_go_time
+            else:
+                return
+
+        for i, car in enumerate(self.cars):
+            inp = inputs[i] if i < len(inputs) else PlayerInput()
+            self.move_car(car, dt, inp)
+            self._check_item_collision(car)
+            if inp.boost:
+                car.activate_boost()
+            self.cp_indices[i] = self._check_checkpoint(car, self.cp_indices[i])
+
+        for i, cp in enumerate(self.cp_indices):
+            if cp >= len(self.track.checkpoints):
+                self.winner = f"P{i + 1}"
+                break
+
+        if self.car_collision:
+            for i in range(len(self.cars)):
+                for j in range(i + 1, len(self.cars)):
+                    self._check_car_to_car_collision(self.cars[i], self.cars[j])
+
+    # -----------------------------
+    # Collision / movement helpers
+    # -----------------------------
+    def move_car(self, car: Car, dt: float, inp: PlayerInput):
+        old_x, old_y = car.x, car.y
+        car.update_control(dt, inp.throttle, inp.brake, inp.left, inp.right)
+        self._sliding_collision(car, old_x, old_y)
+
+    def _sliding_collision(self, car: Car, old_x: float, old_y: float):
+        dx, dy = car.x - old_x, car.y - old_y
+        car.x, car.y = old_x, old_y
+
+        car.x = old_x + dx
+        if self.track.collides_with_walls(car.get_aabb_rect()):
+            car.x = old_x
+
+        car.y = old_y + dy
+        if self.track.collides_with_walls(car.get_aabb_rect()):
+            car.y = old_y
+
+    def _check_item_collision(self, car: Car):
+        if not car.has_item:
+            car_rect = car.get_aabb_rect()
+            for item in self.items[:]:
+                if car_rect.colliderect(item.rect):
+                    self.items.remove(item)
+                    car.has_item = True
+                    break
+
+    def _check_checkpoint(self, car: Car, cp_index: int) -> int:
+        if cp_index >= len(self.track.checkpoints):
+            return cp_index
+        target = self.track.checkpoints[cp_index]
+        if car.get_aabb_rect().colliderect(target):
+            return cp_index + 1
+        return cp_index
+
+    def _check_car_to_car_collision(self, car_a: Car, car_b: Car):
+        # 두 차량의 히트박스(rect) 충돌 감지
+        if not car_a.get_aabb_rect().colliderect(car_b.get_aabb_rect()):
+            return
+
+        # 밀어내기 전 위치를 저장
+        a_old_x, a_old_y = car_a.x, car_a.y
+        b_old_x, b_old_y = car_b.x, car_b.y
+
+        # 두 차량의 중심점 사이 거리 계산 (겹치면 0으로 나누기 방지)
+        dx = car_a.x - car_b.x
+        dy = car_a.y - car_b.y
+        if dx == 0 and dy == 0:
+            dx = 1.0
+
+        # 밀어낼 힘의 크기
+        push_power = 5.0
+
+        # 방향 정규화
+        dist = (dx ** 2 + dy ** 2) ** 0.5
+        if dist > 0:
+            dx /= dist
+            dy /= dist
+
+        # A는 밀려나고, B는 반대로 밀려남
+        car_a.x += dx * push_power
+        car_a.y += dy * push_power
+        car_b.x -= dx * push_power
+        car_b.y -= dy * push_power
+
+        # 벽으로 밀려났다면 원래 위치로 복귀
+        if self.track.collides_with_walls(car_a.get_aabb_rect()):
+            car_a.x, car_a.y = a_old_x, a_old_y
+        if self.track.collides_with_walls(car_b.get_aabb_rect()):
+            car_b.x, car_b.y = b_old_x, b_old_y
+
+        # 속도 감소
+        car_a.speed *= 0.5
+        car_b.speed *= 0.5
+
+    # -----------------------------
+    # Snapshot (네트워크 동기화용)
+    # -----------------------------
+    def snapshot(self) -> dict:
+        return {
+            "start_at": self.start_at,
+            "go_until": self.go_until,
+            "race_started": self.race_started,
+            "map": self.map_id,
+            "items": [{"x": i.rect.x, "y": i.rect.y} for i in self.items],
+            "cars": [
+                {
+                    "x": c.x,
+                    "y": c.y,
+                    "a": c.angle,
+                    "s": c.speed,
+                    "e": c.emote_id,
+                    "hi": c.has_item,
+                    "bt": float(c.boost_timer),
+                }
+                for c in self.cars
+            ],
+            "cps": list(self.cp_indices),
+            "winner": self.winner,
+        }
+
+    def apply_snapshot(self, st: dict):
+        """호스트 snapshot을 그대로 반영 (클라이언트용). 맵 전환은 호출자가 먼저 처리."""
+        if "start_at" in st:
+            self.start_at = st.get("start_at")
+        if "go_until" in st:
+            self.go_until = st.get("go_until")
+        if "race_started" in st:
+            self.race_started = bool(st.get("race_started"))
+
+        cps = st.get("cps")
+        if cps is not None:
+            for i, cp in enumerate(cps[: len(self.cp_indices)]):
+                self.cp_indices[i] = int(cp)
+
+        if "winner" in st:
+            self.winner = st.get("winner")
+
+        if "items" in st:
+            self.items = [Item(d["x"], d["y"]) for d in st.get("items", [])]
+
+        for car, c in zip(self.cars, st.get("cars", [])):
+            car.x = float(c.get("x", car.x))
+            car.y = float(c.get("y", car.y))
+            car.angle = float(c.get("a", car.angle))
+            car.speed = float(c.get("s", car.speed))
+            car.has_item = bool(c.get("hi", car.has_item))
+            car.boost_timer = float(c.get("bt", car.boost_timer))
+            car.emote_id = int(c.get("e", 0))
@@ -0,0 +1,66 @@
+# test_network.py
+import pytest
+
+from network import BinaryFrameCodec, FrameCodec, JsonLineCodec
+
+
+def _input(seq, emote_req=0):
+    return {
+        "type": "input",
+        "throttle": True,
+        "brake": False,
+        "left": False,
+        "right": False,
+        "boost": False,
+        "emote_req": emote_req,
+        "seq": seq,
+        "n": seq,
+    }
+
+
+def _feed(codec, msgs):
+    data = b"".join(codec.encode(m) for m in msgs)
+    buf = codec.get_buffer()
+    buf[: len(data)] = data
+    codec.buffer_updated(len(data))
+
+
+# -----------------------------
+# latest_only drain
+# -----------------------------
+@pytest.mark.parametrize("codec_cls", [JsonLineCodec, BinaryFrameCodec])
+def test_drain_keeps_emote_input_behind_newer_input(codec_cls):
+    codec = codec_cls()
+    _feed(codec, [_input(1, emote_req=3), _input(2)])
+
+    msgs = codec.drain(latest_only=("input",))
+
+    assert [m["seq"] for m in msgs] == [1, 2]
+    assert msgs[0]["emote_req"] == 3
+    assert codec.skipped == 0
+
+
+@pytest.mark.parametrize("codec_cls", [JsonLineCodec, BinaryFrameCodec])
+def test_drain_skips_superseded_plain_input(codec_cls):
+    codec = codec_cls()
+    _feed(codec, [_input(1), _input(2), _input(3)])
+
+    msgs = codec.drain(latest_only=("input",))
+
+    assert [m["seq"] for m in msgs] == [3]
+    assert codec.skipped == 2
+
+
+# -----------------------------
+# FrameCodec
+# -----------------------------
+def test_codec_missing_method_fails_at_construction():
+    class PartialCodec(FrameCodec):
+        def encode(self, obj):
+            return b""
+
+        def next_frame(self):
+            return None
+
+    with pytest.raises(TypeError):
+        PartialCodec()
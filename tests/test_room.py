@@ -0,0 +1,29 @@
+# test_room.py
+from types import SimpleNamespace
+
+from netcode import SendRateController
+from room import Peer
+
+
+def _peer():
+    conn = SimpleNamespace(peer=("127.0.0.1", 5000), closed=False)
+    return Peer(0, conn, SendRateController(30.0, 60.0))
+
+
+# -----------------------------
+# Emote
+# -----------------------------
+def test_resent_emote_is_applied_once():
+    peer = _peer()
+
+    # client는 host ack 전까지 같은 emote(emote_seq=5)를 이후 input에도 계속 실음
+    peer.on_input({"type": "input", "emote_req": 2, "emote_seq": 5, "seq": 5})
+    assert peer.input["emote_req"] == 2
+    peer.input["emote_req"] = 0  # host 틱에서 소비
+
+    peer.on_input({"type": "input", "emote_req": 2, "emote_seq": 5, "seq": 6})
+    assert peer.input["emote_req"] == 0
+
+    # 새로 누른 emote는 다시 적용
+    peer.on_input({"type": "input", "emote_req": 2, "emote_seq": 7, "seq": 7})
+    assert peer.input["emote_req"] == 2
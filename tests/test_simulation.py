@@ -0,0 +1,39 @@
+# test_simulation.py
+import pytest
+
+from simulation import PlayerInput, Simulation
+from track import Track
+
+
+# -----------------------------
+# Spawn
+# -----------------------------
+@pytest.mark.parametrize("map_id", range(len(Track().MAP_DATA)))
+def test_eight_cars_spawn_clear_of_walls(map_id):
+    sim = Simulation(map_id=map_id, num_players=8, seed=0)
+    sim.reset_match()
+
+    rects = [car.get_aabb_rect() for car in sim.cars]
+    for i, rect in enumerate(rects):
+        assert not sim.track.collides_with_walls(rect), f"car {i} at {rect} overlaps a wall"
+        assert rect.collidelist(rects[i + 1:]) == -1, f"car {i} at {rect} overlaps another car"
+
+
+# -----------------------------
+# Emote
+# -----------------------------
+def test_emote_expires_on_sim_clock():
+    sim = Simulation(map_id=0, num_players=2, seed=0)
+    sim.reset_match(spawn_items=False)
+
+    sim.step([PlayerInput(emote_req=3), PlayerInput()])
+    assert sim.cars[0].emote_id == 3
+    assert sim.snapshot()["cars"][0]["e"] == 3
+
+    # draw()를 호출하지 않아도 (헤드리스 서버) 시뮬레이션 시계로 만료
+    ticks = int(sim.cars[0].emote_duration / sim.dt) + 1
+    for _ in range(ticks):
+        sim.step([PlayerInput(), PlayerInput()])
+
+    assert sim.cars[0].emote_id == 0
+    assert sim.snapshot()["cars"][0]["e"] == 0
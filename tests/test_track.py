@@ -0,0 +1,20 @@
+# test_track.py
+import random
+
+import pygame
+import pytest
+
+from track import Track
+
+
+# -----------------------------
+# Wall queries
+# -----------------------------
+@pytest.mark.parametrize("map_id", range(len(Track().MAP_DATA)))
+def test_collides_with_walls_matches_linear_scan(map_id):
+    track = Track(map_id)
+    rng = random.Random(map_id)
+
+    for _ in range(20000):
+        rect = pygame.Rect(rng.randint(-40, 940), rng.randint(-40, 640), rng.randint(1, 80), rng.randint(1, 80))
+        assert track.collides_with_walls(rect) == (rect.collidelist(track.walls) != -1), rect
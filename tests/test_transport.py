@@ -0,0 +1,20 @@
+# test_transport.py
+from transport import Transport
+
+
+# -----------------------------
+# stop
+# -----------------------------
+def test_stop_closes_everything_it_opened():
+    transport = Transport()
+    listener = transport.listen(0, backlog=4)
+    client = transport.connect("127.0.0.1", listener.port)
+    udp = transport.open_udp()
+
+    transport.stop()
+
+    assert transport.loop.is_closed()
+    assert client.closed
+    assert all(conn.closed for conn in listener.accepted)
+    assert udp._tr.is_closing()
+    assert not listener._server.is_serving()
@@ -1,18 +1,184 @@
 # track.py
 import random
 import math
+from bisect import bisect_left, bisect_right
+
 import pygame
 
+from fonts import get_font, render_text
+
+
+class WallOccupancy:
+    """
+    벽 점유 격자 + 누적합(summed-area table):
+    - 벽 모서리 좌표(x, y)로 압축한 비균일 격자를 래스터화 → 픽셀 격자와 같은 결과, 칸 수는 벽 수에 비례
+    - AABB 질의는 bisect 4번 + 누적합 4번 조회로 끝 (벽 개수와 무관)
+    - 앞단에 균일 격자(GRID_CELL px) broad phase: 칸마다 비었음/꽉 참/섞임을 미리 분류해
+      비었거나 꽉 찬 칸만 걸치는 질의(대부분)는 나눗셈 몇 번으로 끝, 섞인 칸에 걸칠 때만 누적합 조회
+    - 같은 벽 배치는 클래스 캐시로 공유 (맵 재선택/리매치/여러 방에서 재사용)
+    """
+
+    _cache: dict[tuple, "WallOccupancy"] = {}
+
+    # 균일 격자 칸 상태
+    GRID_CELL = 16
+    EMPTY, FULL, MIXED = 0, 1, 2
+
+    @classmethod
+    def for_walls(cls, walls: list[pygame.Rect]) -> "WallOccupancy":
+        key = tuple(tuple(w) for w in walls)
+        occ = cls._cache.get(key)
+        if occ is None:
+            occ = cls(walls)
+            cls._cache[key] = occ
+        return occ
+
+    def __init__(self, walls: list[pygame.Rect]):
+        walls = [w for w in walls if w.width > 0 and w.height > 0]
+        self.xs = sorted({w.left for w in walls} | {w.right for w in walls})
+        self.ys = sorted({w.top for w in walls} | {w.bottom for w in walls})
+        nx = max(0, len(self.xs) - 1)
+        ny = max(0, len(self.ys) - 1)
+        self.nx, self.ny = nx, ny
+
+        # 점유 격자 (ny x nx)
+        x_index = {x: i for i, x in enumerate(self.xs)}
+        y_index = {y: j for j, y in enumerate(self.ys)}
+        occ = [[0] * nx for _ in range(ny)]
+        for w in walls:
+            i0, i1 = x_index[w.left], x_index[w.right]
+            j0, j1 = y_index[w.top], y_index[w.bottom]
+            for j in range(j0, j1):
+                row = occ[j]
+                for i in range(i0, i1):
+                    row[i] = 1
+
+        # 누적합: sat[j][i] = occ[0:j][0:i] 합
+        sat = [[0] * (nx + 1) for _ in range(ny + 1)]
+        for j in range(ny):
+            acc = 0
+            row, prev, cur = occ[j], sat[j], sat[j + 1]
+            for i in range(nx):
+                acc += row[i]
+                cur[i + 1] = prev[i + 1] + acc
+        self.sat = sat
+        self._build_grid()
+
+        # (width, height, obj_w, obj_h) -> 벽과 겹치지 않는 좌상단 좌표 목록
+        self._safe_points: dict[tuple, list[tuple[int, int]]] = {}
+
+    def _build_grid(self):
+        # 벽이 있는 범위 [0, xs[-1]) x [0, ys[-1])를 GRID_CELL 칸으로 나눠 칸마다 상태 분류
+        c = self.GRID_CELL
+        self.gw = -(-self.xs[-1] // c) if self.xs else 0
+        self.gh = -(-self.ys[-1] // c) if self.ys else 0
+        cell = pygame.Rect(0, 0, c, c)
+        # 압축 격자가 덮는 범위 (이 밖에 걸친 칸은 꽉 찰 수 없음)
+        covered = pygame.Rect(0, 0, 0, 0)
+        if self.xs:
+            covered = pygame.Rect(self.xs[0], self.ys[0], self.xs[-1] - self.xs[0], self.ys[-1] - self.ys[0])
+        grid = []
+        for gy in range(self.gh):
+            row = []
+            for gx in range(self.gw):
+                cell.topleft = (gx * c, gy * c)
+                filled = self._sat_count(cell)
+                if filled == 0:
+                    row.append(self.EMPTY)
+                elif covered.contains(cell) and filled == self._cell_count(cell):
+                    row.append(self.FULL)
+                else:
+                    row.append(self.MIXED)
+            grid.append(bytes(row))
+        self.grid = grid
+
+    def _cells(self, lo: int, hi: int, edges: list[int], n: int):
+        # [lo, hi) 구간과 겹치는 칸 인덱스 범위 [c0, c1)
+        c0 = max(0, bisect_right(edges, lo) - 1)
+        c1 = min(n, bisect_left(edges, hi))
+        return c0, c1
+
+    def _cell_count(self, rect: pygame.Rect) -> int:
+        # rect와 겹치는 압축 격자 칸 수
+        i0, i1 = self._cells(rect.left, rect.right, self.xs, self.nx)
+        j0, j1 = self._cells(rect.top, rect.bottom, self.ys, self.ny)
+        return max(0, i1 - i0) * max(0, j1 - j0)
+
+    def _sat_count(self, rect: pygame.Rect) -> int:
+        # rect와 겹치는 압축 격자 칸 중 벽인 칸 수
+        i0, i1 = self._cells(rect.left, rect.right, self.xs, self.nx)
+        if i0 >= i1:
+            return 0
+        j0, j1 = self._cells(rect.top, rect.bottom, self.ys, self.ny)
+        if j0 >= j1:
+            return 0
+        sat = self.sat
+        return sat[j1][i1] - sat[j0][i1] - sat[j1][i0] + sat[j0][i0]
+
+    def collides(self, rect: pygame.Rect) -> bool:
+        if rect.width <= 0 or rect.height <= 0:
+            return False
+
+        # broad phase: 걸치는 균일 격자 칸이 모두 비었으면 False, 하나라도 꽉 찼으면 True
+        c = self.GRID_CELL
+        gx0, gx1 = rect.left // c, (rect.right - 1) // c
+        gy0, gy1 = rect.top // c, (rect.bottom - 1) // c
+        if gx0 >= 0 and gy0 >= 0 and gx1 < self.gw and gy1 < self.gh:
+            mixed = False
+            for row in self.grid[gy0:gy1 + 1]:
+                states = row[gx0:gx1 + 1]
+                if self.FULL in states:
+                    return True
+                mixed = mixed or self.MIXED in states
+            if not mixed:
+                return False
+
+        # narrow phase (섞인 칸에 걸치거나 격자 밖까지 걸침): 누적합
+        return self._sat_count(rect) > 0
+
+    def is_wall_at(self, x: int, y: int) -> bool:
+        return self.collides(pygame.Rect(int(x), int(y), 1, 1))
+
+    def safe_points(self, width: int, height: int, obj_w: int, obj_h: int, margin: int, step: int):
+        """
+        [margin, width-margin] x [margin, height-margin] 범위를 step 간격으로 층화 샘플링해
+        obj_w x obj_h 상자가 벽에 닿지 않는 위치를 모두 모아 둠 (한 번만 계산)
+        """
+        key = (width, height, obj_w, obj_h, margin, step)
+        pts = self._safe_points.get(key)
+        if pts is None:
+            pts = []
+            rect = pygame.Rect(0, 0, obj_w, obj_h)
+            for x in range(margin, width - margin + 1, step):
+                for y in range(margin, height - margin + 1, step):
+                    rect.topleft = (x, y)
+                    if not self.collides(rect):
+                        pts.append((x, y))
+            self._safe_points[key] = pts
+        return pts
+
 
 class Track:
     """
     통합 Track:
     - Track(map_id=0) + load_map(map_id)
     - spawn_points 제공 (car spawn)
-    - get_random_safe_point 제공 (아이템 스폰)
+    - get_random_safe_point 제공 (아이템 스폰, 미리 계산한 안전 좌표 테이블에서 선택)
     - draw()는 "fill을 하지 않음" (Game이 배경 fill 담당)
+    - draw_static()은 배경+테두리+벽+체크포인트를 미리 그린 레이어를 한 번에 blit (맵 변경 시에만 재생성)
+    - collides_with_walls() / is_wall_at()은 WallOccupancy (균일 격자 broad phase + 누적합)로 O(1) 판정
     """
 
+    # 아이템 스폰 테이블 (화면 크기 / 아이템 크기 / 가장자리 여백 / 샘플 간격)
+    WIDTH, HEIGHT = 900, 600
+    ITEM_SIZE = 16
+    SPAWN_MARGIN = 50
+    SPAWN_STEP = 4
+
+    # 정적 레이어 색상 (배경 / 화면 테두리)
+    BG_COLOR = (40, 90, 40)
+    BORDER_COLOR = (30, 30, 30)
+
     def __init__(self, map_id: int = 0):
         self.walls: list[pygame.Rect] = []
         self.checkpoints: list[pygame.Rect] = []
@@ -20,12 +186,13 @@ class Track:
         self.spawn_points = [(300, 540), (350, 540)]
         self.spawn_angle = 0.0 # 추가 - 라디안 단위
 
+        # (map_id, 화면 크기) -> 미리 그린 정적 레이어
+        self.map_id = map_id
+        self._static_layers: dict[tuple, pygame.Surface] = {}
 
-        # pygame.init() 이후에 font 사용 가능
-        try:
-            self.font = pygame.font.SysFont("Arial", 30, bold=True)
-        except Exception:
-            self.font = None
+
+        # 체크포인트 번호 폰트는 처음 그릴 때 생성 (헤드리스 서버는 폰트를 로드하지 않음)
+        self.font = None
 
         # 기존 track.py의 맵(=Map 1로 사용)
         T = 16
@@ -143,17 +310,41 @@ class Track:
             map_id = 0
 
         data = self.MAP_DATA[map_id]
+        self.map_id = map_id
         self.walls = data["walls"]
         self.checkpoints = data["checkpoints"]
         self.spawn_points = data.get("spawn_points", [(300, 540), (350, 540)])
         self.spawn_angle = data.get("spawn_angle", 0.0) # 추가
 
+        self.occupancy = WallOccupancy.for_walls(self.walls)
+
+        # 기본 아이템 크기 스폰 테이블 미리 계산 (같은 맵이면 캐시 재사용)
+        self.occupancy.safe_points(
+            self.WIDTH, self.HEIGHT, self.ITEM_SIZE, self.ITEM_SIZE, self.SPAWN_MARGIN, self.SPAWN_STEP
+        )
 
     def collides_with_walls(self, rect: pygame.Rect) -> bool:
-        for w in self.walls:
-            if rect.colliderect(w):
-                return True
-        return False
+        return self.occupancy.collides(rect)
+
+    def is_wall_at(self, x: int, y: int) -> bool:
+        return self.occupancy.is_wall_at(x, y)
+
+    def get_static_layer(self, size: tuple[int, int]) -> pygame.Surface:
+        key = (self.map_id, tuple(size))
+        layer = self._static_layers.get(key)
+        if layer is None:
+            layer = pygame.Surface(size)
+            if pygame.display.get_surface() is not None:
+                layer = layer.convert()
+            layer.fill(self.BG_COLOR)
+            pygame.draw.rect(layer, self.BORDER_COLOR, layer.get_rect(), 6)
+            self.draw(layer)
+            self._static_layers[key] = layer
+        return layer
+
+    def draw_static(self, screen: pygame.Surface):
+        # 배경 fill + 테두리 + draw()를 대신하는 한 번의 blit
+        screen.blit(self.get_static_layer(screen.get_size()), (0, 0))
 
     def draw(self, screen: pygame.Surface):
         # NOTE: 배경 fill은 Game이 담당 (통합 규칙)
@@ -161,17 +352,22 @@ class Track:
             pygame.draw.rect(screen, (100, 100, 100), w)
             pygame.draw.rect(screen, (150, 150, 150), w, 2)
 
+        if self.font is None:
+            # pygame.init() 이후에 font 사용 가능
+            try:
+                self.font = get_font("Arial", 30, bold=True)
+            except Exception:
+                self.font = False
+
         for i, cp in enumerate(self.checkpoints):
             pygame.draw.rect(screen, (0, 255, 0), cp, 4)
             if self.font:
-                text = self.font.render(str(i + 1), True, (255, 255, 255))
+                text = render_text(self.font, str(i + 1), (255, 255, 255))
                 screen.blit(text, text.get_rect(center=cp.center))
 
-    def get_random_safe_point(self, width: int, height: int, obj_w: int, obj_h: int):
-        for _ in range(50):
-            x = random.randint(50, width - 50)
-            y = random.randint(50, height - 50)
-            rect = pygame.Rect(x, y, obj_w, obj_h)
-            if not self.collides_with_walls(rect):
-                return (x, y)
-        return None
+    def get_random_safe_point(self, width: int, height: int, obj_w: int, obj_h: int, rng=None):
+        # 미리 계산한 안전 좌표 테이블에서 O(1) 선택 (테이블이 비면 None)
+        table = self.occupancy.safe_points(width, height, obj_w, obj_h, self.SPAWN_MARGIN, self.SPAWN_STEP)
+        if not table:
+            return None
+        return (rng or random).choice(table)
@@ -0,0 +1,603 @@
+# transport.py
+"""
+asyncio 네트워크 백엔드 (이벤트 루프 스레드 1개에서 모든 소켓 I/O 처리):
+- Transport: 전용 스레드에서 SelectorEventLoop 실행, 게임 루프는 스레드 안전한 메서드만 호출
+- listen() / connect(): TCP accept/connect + hello 핸드셰이크(wire 포맷 협상) → Connection
+- Connection: 받은 메시지는 inbox(deque)에 쌓고 게임 루프가 popleft로 꺼냄 (락 없음)
+  send()는 SendQueue에 넣고(state/input coalesce) 이벤트 루프가 write
+- heartbeat: 보낼 게 없으면 주기적으로 hb 전송, 상대에게서 한동안 아무것도 안 오면 연결 종료
+- 시계 동기화: client가 ping, host가 pong (둘 다 이벤트 루프에서 바로 처리 → 게임 루프/송신 큐 지연 없음)
+  결과는 client Connection.clock (netcode.ClockSync: offset / rtt)
+- open_udp(): state/input용 데이터그램 엔드포인트 (inbox에 (메시지, 주소))
+- announce(): 검색 질의에 unicast로 응답하는 RoomAnnouncer (+ 느린 broadcast beacon)
+- browse_rooms(): 질의를 multicast하고 응답/beacon을 계속 수신하는 RoomBrowser (블로킹 없이 목록 표시)
+"""
+import asyncio
+import socket
+import threading
+import time
+import weakref
+from collections import deque
+
+import network
+import protocol
+from netcode import ClockSync
+
+HEARTBEAT_INTERVAL = 1.0
+HEARTBEAT_TIMEOUT = 5.0
+HANDSHAKE_TIMEOUT = 2.0
+
+
+class Connection:
+    """
+    TCP 연결 1개 (이벤트 루프 쪽 콜백 + 게임 루프 쪽 API):
+    - 게임 루프: send(obj), inbox, closed, queue_stats(), close(), clock (client만)
+    - latest_only 타입은 한 번에 도착한 프레임 중 가장 새 것만 inbox로 (superseded 디코딩 생략, emote_req가 실린 input은 유지)
+    """
+
+    # 대기 중이면 최신 것으로 덮어써도 되는 메시지
+    SUPERSEDED_TYPES = ("state", "input")
+
+    def __init__(self, loop, role, binary=True, latest_only=()):
+        self.loop = loop
+        self.role = role  # "host" | "client"
+        self.binary = binary
+        self.latest_only = latest_only
+
+        self.codec = network.JsonLineCodec()
+        self.wire = protocol.WIRE_JSON
+        self.queue = network.SendQueue()
+        self.inbox = deque()
+        self.peer = None
+        self.closed = False
+
+        self.ready = loop.create_future()  # 핸드셰이크 완료
+        self._tr = None
+        self._handshaking = True
+        self._paused = False
+        self._flush_scheduled = False
+        self._last_recv = time.monotonic()
+        self._last_send = time.monotonic()
+        self._hb_task = None
+        self._clock_task = None
+        self.clock = ClockSync() if role == "client" else None
+        self.remote_rtt = None  # host: client가 ping에 실어 보낸 RTT
+
+    # --- 게임 루프 쪽 (스레드 안전) ---
+    def send(self, obj):
+        if self.closed:
+            return
+        # emote_req는 1회성이므로 뒤의 input으로 덮어쓰면 유실됨
+        sticky = obj.get("type") == "input" and bool(obj.get("emote_req"))
+        self.send_encoded(self.codec.encode(obj), obj.get("type"), sticky)
+
+    def send_encoded(self, data, msg_type=None, sticky=False):
+        """이미 self.codec 포맷으로 인코딩된 프레임 전송 (여러 연결에 같은 bytes 재사용)"""
+        if self.closed:
+            return
+        self.queue.put(data, msg_type if msg_type in self.SUPERSEDED_TYPES else None, sticky)
+        if not self._flush_scheduled:
+            self._flush_scheduled = True
+            self.loop.call_soon_threadsafe(self._flush)
+
+    def queue_stats(self):
+        return self.queue.stats()
+
+    def close(self):
+        self.queue.close()
+        if not self.loop.is_closed():
+            self.loop.call_soon_threadsafe(self._close)
+
+    # --- 이벤트 루프 쪽 ---
+    def _attach(self, tr):
+        self._tr = tr
+        self.peer = tr.get_extra_info("peername")
+        sock = tr.get_extra_info("socket")
+        if sock is not None:
+            network.set_nodelay(sock)
+        if self.role == "client":
+            offer = [protocol.WIRE_BINARY, protocol.WIRE_JSON] if self.binary else [protocol.WIRE_JSON]
+            self._write({"type": "hello", "wire": offer})
+        self.loop.call_later(HANDSHAKE_TIMEOUT, self._handshake_timeout)
+
+    def _write(self, obj):
+        self._tr.write(self.codec.encode(obj))
+        self._last_send = time.monotonic()
+
+    def _finish_handshake(self, wire):
+        # hello 이후 바이트는 새 포맷으로 해석
+        if wire == protocol.WIRE_BINARY:
+            self.codec = network.BinaryFrameCodec(self.codec.leftover())
+        self.wire = wire
+        self._handshaking = False
+        self._hb_task = self.loop.create_task(self._heartbeat())
+        if self.clock is not None:
+            self._clock_task = self.loop.create_task(self._clock_sync())
+        if not self.ready.done():
+            self.ready.set_result(self)
+        # 핸드셰이크 중 게임 루프가 넣어 둔 메시지를 새 포맷으로 다시 인코딩할 필요는 없음
+        # (ready 전에는 Connection이 게임 루프에 넘어가지 않음)
+        self._flush()
+
+    def _handshake_timeout(self):
+        # 상대가 hello를 모르면 JSON line 유지
+        if self._handshaking and not self.closed:
+            self._finish_handshake(protocol.WIRE_JSON)
+
+    def _on_data(self, nbytes):
+        self._last_recv = time.monotonic()
+        self.codec.buffer_updated(nbytes)
+        try:
+            while self._handshaking:
+                frame = self.codec.next_frame()
+                if frame is None:
+                    return
+                self._on_hello(self.codec.decode(frame))
+            msgs = self.codec.drain(self.latest_only)
+        except protocol.ProtocolError:
+            self._close()
+            return
+        for msg in msgs:
+            t = msg.get("type")
+            if t == "hb":
+                continue
+            if t == "ping" and self.clock is None:
+                # 받은 즉시 응답 (t1 = 이번 데이터 수신 시각)
+                self._write(ClockSync.make_pong(msg, self._last_recv, time.monotonic()))
+                if msg.get("rtt") is not None:
+                    self.remote_rtt = float(msg["rtt"])
+            elif t == "pong" and self.clock is not None:
+                self.clock.on_pong(msg, self._last_recv)
+            else:
+                self.inbox.append(msg)
+
+    def _on_hello(self, msg):
+        if not msg or msg.get("type") != "hello":
+            # hello 없이 바로 게임 메시지를 보내는 상대: JSON line
+            if msg is not None:
+                self.inbox.append(msg)
+            self._finish_handshake(protocol.WIRE_JSON)
+            return
+
+        if self.role == "client":
+            wire = msg.get("wire")
+            self._finish_handshake(protocol.WIRE_BINARY if wire == protocol.WIRE_BINARY else protocol.WIRE_JSON)
+            return
+
+        wire = protocol.WIRE_JSON
+        if self.binary and protocol.WIRE_BINARY in msg.get("wire", []):
+            wire = protocol.WIRE_BINARY
+        self._write({"type": "hello", "wire": wire})
+        self._finish_handshake(wire)
+
+    def _flush(self):
+        self._flush_scheduled = False
+        if self._tr is None or self._handshaking or self._paused or self.closed:
+            return
+        while True:
+            data = self.queue.get_nowait()
+            if data is None:
+                break
+            self._tr.write(data)
+            self._last_send = time.monotonic()
+
+    def _pause_writing(self):
+        # 커널 송신 버퍼가 차면 큐에 남겨서 state/input이 계속 coalesce되도록
+        self._paused = True
+
+    def _resume_writing(self):
+        self._paused = False
+        self._flush()
+
+    async def _heartbeat(self):
+        while not self.closed:
+            await asyncio.sleep(HEARTBEAT_INTERVAL)
+            now = time.monotonic()
+            if now - self._last_recv > HEARTBEAT_TIMEOUT:
+                self._close()
+                break
+            if now - self._last_send >= HEARTBEAT_INTERVAL and not self._paused:
+                self._write({"type": "hb"})
+
+    async def _clock_sync(self):
+        # 송신 큐를 거치지 않고 바로 write (큐 대기 시간이 RTT에 섞이지 않도록)
+        while not self.closed:
+            if not self._paused:
+                self._write(self.clock.make_ping(time.monotonic()))
+            await asyncio.sleep(self.clock.next_interval())
+
+    def _close(self):
+        if self._tr is not None:
+            self._tr.close()
+        self._on_lost()
+
+    def _on_lost(self):
+        if self.closed:
+            return
+        self.closed = True
+        self.queue.close()
+        for task in (self._hb_task, self._clock_task):
+            if task is not None:
+                task.cancel()
+        if not self.ready.done():
+            self.ready.set_exception(ConnectionError("connection closed during handshake"))
+
+
+class _StreamProtocol(asyncio.BufferedProtocol):
+    """asyncio 콜백 → Connection 연결 (recv_into로 codec 버퍼에 직접 수신)"""
+
+    def __init__(self, conn: Connection):
+        self.conn = conn
+
+    def connection_made(self, transport):
+        self.conn._attach(transport)
+
+    def get_buffer(self, sizehint):
+        return self.conn.codec.get_buffer()
+
+    def buffer_updated(self, nbytes):
+        self.conn._on_data(nbytes)
+
+    def eof_received(self):
+        return False
+
+    def connection_lost(self, exc):
+        self.conn._on_lost()
+
+    def pause_writing(self):
+        self.conn._pause_writing()
+
+    def resume_writing(self):
+        self.conn._resume_writing()
+
+
+class Listener:
+    """host accept 대기: 핸드셰이크가 끝난 Connection이 accepted(deque)에 들어옴"""
+
+    def __init__(self, loop):
+        self.loop = loop
+        self.accepted = deque()
+        self.port = None
+        self._server = None
+
+    def _close(self):
+        if self._server is not None:
+            self._server.close()
+
+    def close(self):
+        if not self.loop.is_closed():
+            self.loop.call_soon_threadsafe(self._close)
+
+
+class UdpEndpoint(asyncio.DatagramProtocol):
+    """
+    state / input 전용 비신뢰 UDP 채널 (TCP 제어 링크와 병행):
+    - 데이터그램 1개 = protocol 바이너리 프레임 1개, 받은 것은 inbox에 (메시지, 주소)
+    - 유실/순서 뒤바뀜은 메시지의 seq로 수신측에서 걸러냄 (오래된 패킷 drop)
+    - 상대 주소는 TCP의 udp_hello 교환 또는 첫 수신 패킷으로 결정
+    """
+
+    def __init__(self, loop):
+        self.loop = loop
+        self.inbox = deque()
+        self.peer = None
+        self.port = None
+        self._tr = None
+
+    def connection_made(self, transport):
+        self._tr = transport
+        self.port = transport.get_extra_info("sockname")[1]
+
+    def datagram_received(self, data, addr):
+        msg = network.decode_datagram(data)
+        if msg is not None:
+            self.inbox.append((msg, addr))
+
+    def error_received(self, exc):
+        pass
+
+    def set_peer(self, addr):
+        self.peer = (addr[0], int(addr[1]))
+
+    def send(self, obj):
+        """게임 루프에서 호출. 상대 주소를 모르면 False (호출측이 TCP로 대신 전송)"""
+        peer = self.peer
+        if peer is None or self._tr is None or self.loop.is_closed():
+            return False
+        self.loop.call_soon_threadsafe(self._sendto, protocol.encode_message(obj), peer)
+        return True
+
+    def sendto(self, data, addr):
+        """이미 인코딩된 바이너리 프레임을 지정 주소로 (host가 여러 client에 같은 bytes 전송)"""
+        if self._tr is None or self.loop.is_closed():
+            return False
+        self.loop.call_soon_threadsafe(self._sendto, data, addr)
+        return True
+
+    def _sendto(self, data, peer):
+        if not self._tr.is_closing():
+            self._tr.sendto(data, peer)
+
+    def _close(self):
+        if self._tr is not None:
+            self._tr.close()
+
+    def close(self):
+        if not self.loop.is_closed():
+            self.loop.call_soon_threadsafe(self._close)
+
+
+class RoomAnnouncer(asyncio.DatagramProtocol):
+    """
+    host 방 광고 (0.5초 broadcast flood 대체):
+    - 검색 중인 client의 room_query(multicast)에만 unicast로 응답 → 트래픽은 검색하는 사람 수에 비례
+    - 구버전/multicast가 막힌 망을 위해 beacon_interval초마다 broadcast (None이면 끔)
+    - 응답에는 실시간 상태 (인원, 맵, 레이스 중 여부): 게임 루프가 set_status()로 갱신
+    """
+
+    def __init__(self, loop, payload, beacon_interval=None):
+        self.loop = loop
+        self.payload = payload
+        self.beacon_interval = beacon_interval
+        self._status = {}
+        self._tr = None
+        self._beacon_task = None
+
+    def connection_made(self, transport):
+        self._tr = transport
+        if self.beacon_interval:
+            self._beacon_task = self.loop.create_task(self._beacon())
+
+    def datagram_received(self, data, addr):
+        obj = network.decode_discovery(data)
+        if obj is not None and obj.get("type") == "room_query":
+            self._tr.sendto(self._message(), addr)
+
+    def error_received(self, exc):
+        pass
+
+    def set_status(self, **status):
+        """게임 루프에서 호출 (dict를 통째로 교체 → 이벤트 루프는 항상 완성된 상태를 읽음)"""
+        self._status = status
+
+    def _message(self):
+        msg = dict(self.payload, **self._status)
+        msg["ts"] = time.time()
+        return network.encode_discovery(msg)
+
+    async def _beacon(self):
+        while True:
+            if not self._tr.is_closing():
+                # NIC마다 자기 망의 broadcast 주소로 (255.255.255.255는 기본 인터페이스로만 나감)
+                msg = self._message()
+                for addr in network.interfaces.broadcast_addrs():
+                    self._tr.sendto(msg, (addr, network.UDP_PORT))
+            await asyncio.sleep(self.beacon_interval)
+
+    def _close(self):
+        if self._beacon_task is not None:
+            self._beacon_task.cancel()
+        if self._tr is not None:
+            self._tr.close()
+
+    def close(self):
+        if not self.loop.is_closed():
+            self.loop.call_soon_threadsafe(self._close)
+
+
+class RoomBrowser(asyncio.DatagramProtocol):
+    """
+    방 검색 (discover_rooms의 1.2초 블로킹 수신 대체):
+    - query_interval초마다 room_query를 multicast, host의 unicast 응답 + beacon을 모두 수신
+    - 이벤트 루프가 광고를 받아 inbox에 쌓고, 게임 루프가 poll()로 RoomTable에 반영
+    - poll()은 이번에 바뀐 (종류, room_id) 리스트를 반환 (비어 있으면 화면 갱신 불필요)
+    - ttl초 동안 응답/광고가 없는 방은 목록에서 제거
+    """
+
+    def __init__(self, loop, ttl=6.0, query_interval=2.0):
+        self.loop = loop
+        self.inbox = deque()
+        self.table = network.RoomTable(ttl)
+        self.query_interval = query_interval
+        self._trs = []  # beacon 수신 소켓, 질의 소켓
+        self._query_tr = None
+        self._query_task = None
+
+    @property
+    def rooms(self):
+        return self.table.rooms
+
+    def connection_made(self, transport):
+        self._trs.append(transport)
+
+    def datagram_received(self, data, addr):
+        obj = network.decode_announce(data, addr)
+        if obj is not None:
+            self.inbox.append(obj)
+
+    def error_received(self, exc):
+        pass
+
+    def poll(self):
+        changes = []
+        inbox = self.inbox
+        while inbox:
+            change = self.table.update(inbox.popleft())
+            if change is not None:
+                changes.append(change)
+        changes.extend(self.table.evict())
+        return changes
+
+    def refresh(self):
+        """목록을 비우고 바로 다시 질의"""
+        self.inbox.clear()
+        if not self.loop.is_closed():
+            self.loop.call_soon_threadsafe(self._send_query)
+        return self.table.clear()
+
+    def _send_query(self):
+        tr = self._query_tr
+        if tr is None or tr.is_closing():
+            return
+        msg = network.encode_discovery({"type": "room_query"})
+        sock = tr.get_extra_info("socket")
+        ips = network.interfaces.interface_ips()
+        if not ips:
+            tr.sendto(msg, (network.MCAST_GROUP, network.QUERY_PORT))
+            return
+        # multicast는 송신 인터페이스 하나로만 나가므로 NIC마다 바꿔 가며 전송
+        for ip in ips:
+            try:
+                sock.setsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_IF, socket.inet_aton(ip))
+            except OSError:
+                continue
+            tr.sendto(msg, (network.MCAST_GROUP, network.QUERY_PORT))
+
+    async def _query_loop(self):
+        while True:
+            self._send_query()
+            await asyncio.sleep(self.query_interval)
+
+    def _close(self):
+        if self._query_task is not None:
+            self._query_task.cancel()
+        for tr in self._trs:
+            tr.close()
+
+    def close(self):
+        if not self.loop.is_closed():
+            self.loop.call_soon_threadsafe(self._close)
+
+
+class Transport:
+    """
+    네트워크 I/O 전용 이벤트 루프 스레드:
+    - 게임 루프 → 루프: call_soon_threadsafe / run_coroutine_threadsafe
+    - 루프 → 게임 루프: Connection.inbox, Listener.accepted, UdpEndpoint.inbox (deque)
+    - stop(): 열어 둔 연결/리스너/UDP/검색 소켓을 루프 스레드에서 모두 닫은 뒤 루프 종료
+    """
+
+    def __init__(self):
+        self.loop = asyncio.SelectorEventLoop()
+        # 이 Transport가 연 것 (stop에서 닫음, 닫혀서 버려진 것은 자동으로 빠짐)
+        self._opened = weakref.WeakSet()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_forever()
+        self.loop.close()
+
+    def _call(self, coro, timeout=None):
+        return asyncio.run_coroutine_threadsafe(coro, self.loop).result(timeout)
+
+    # --- TCP ---
+    def listen(self, port, binary=True, latest_only=(), backlog=1) -> Listener:
+        listener = Listener(self.loop)
+        srv_sock = network.tcp_host_listen(port, backlog)
+        listener.port = srv_sock.getsockname()[1]
+
+        def on_accept():
+            conn = Connection(self.loop, "host", binary, latest_only)
+            self._opened.add(conn)
+            conn.ready.add_done_callback(
+                lambda f: listener.accepted.append(conn) if not f.exception() else None
+            )
+            return _StreamProtocol(conn)
+
+        async def start():
+            listener._server = await self.loop.create_server(on_accept, sock=srv_sock)
+            self._opened.add(listener)
+
+        self._call(start())
+        return listener
+
+    def connect(self, host, port, binary=True, latest_only=(), timeout=4.0) -> Connection:
+        """접속 + 핸드셰이크까지 대기 (실패 시 OSError/TimeoutError)"""
+
+        async def start():
+            conn = Connection(self.loop, "client", binary, latest_only)
+            self._opened.add(conn)
+            await asyncio.wait_for(
+                self.loop.create_connection(lambda: _StreamProtocol(conn), host, port), timeout
+            )
+            return await conn.ready
+
+        return self._call(start(), timeout + HANDSHAKE_TIMEOUT + 1.0)
+
+    # --- UDP ---
+    def open_udp(self, port=0) -> UdpEndpoint:
+        sock = network.udp_bind(port)
+
+        async def start():
+            _tr, ep = await self.loop.create_datagram_endpoint(lambda: UdpEndpoint(self.loop), sock=sock)
+            self._opened.add(ep)
+            return ep
+
+        return self._call(start())
+
+    # --- discovery ---
+    def announce(self, room_id, room_name, tcp_port, beacon_interval=5.0) -> RoomAnnouncer:
+        """검색 질의 응답 + beacon 시작. 방을 닫을 때 close()"""
+        payload = {
+            "type": "room_announce",
+            "room_id": room_id,
+            "room_name": room_name,
+            "ip": network.get_local_ip(),
+            "port": tcp_port,
+        }
+        sock = network.announce_bind()
+
+        async def start():
+            _tr, announcer = await self.loop.create_datagram_endpoint(
+                lambda: RoomAnnouncer(self.loop, payload, beacon_interval), sock=sock
+            )
+            self._opened.add(announcer)
+            return announcer
+
+        return self._call(start())
+
+    def browse_rooms(self, ttl=6.0, query_interval=2.0) -> RoomBrowser:
+        """방 검색 시작 (beacon 수신 + 주기적 질의). 검색 화면을 떠날 때 close()"""
+        beacon_sock = network.discovery_bind()
+        query_sock = network.query_bind()
+
+        async def start():
+            browser = RoomBrowser(self.loop, ttl, query_interval)
+            self._opened.add(browser)
+            await self.loop.create_datagram_endpoint(lambda: browser, sock=beacon_sock)
+            browser._query_tr, _ = await self.loop.create_datagram_endpoint(lambda: browser, sock=query_sock)
+            browser._query_task = self.loop.create_task(browser._query_loop())
+            return browser
+
+        return self._call(start())
+
+    def stop(self, timeout=2.0):
+        """열어 둔 소켓을 모두 닫고 루프 종료 (닫기가 끝날 때까지 최대 timeout초 대기)"""
+
+        async def shutdown():
+            opened = list(self._opened)
+            for obj in opened:
+                obj._close()
+            servers = [obj._server for obj in opened if isinstance(obj, Listener) and obj._server is not None]
+            for server in servers:
+                await server.wait_closed()
+            # transport.close()는 다음 루프 반복에서 connection_lost를 부르므로 한 번 양보
+            await asyncio.sleep(0)
+
+            # 남은 heartbeat/beacon 태스크를 취소한 뒤 루프 종료
+            current = asyncio.current_task()
+            for task in asyncio.all_tasks(self.loop):
+                if task is not current:
+                    task.cancel()
+            self.loop.call_soon(self.loop.stop)
+
+        if self.loop.is_closed():
+            return
+        try:
+            self._call(shutdown(), timeout)
+        except Exception:
+            # 닫기가 막혀도 루프는 멈춤
+            self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join(timeout)
@@ -1,6 +1,8 @@
 # ui.py
 import pygame
 
+from fonts import render_text
+
 class Button:
     def __init__(self, rect, text, font):
         self.rect = pygame.Rect(rect)
@@ -12,7 +14,7 @@ class Button:
         bg = (70, 70, 70) if self.enabled else (40, 40, 40)
         pygame.draw.rect(screen, bg, self.rect, border_radius=10)
         pygame.draw.rect(screen, (120, 120, 120), self.rect, 2, border_radius=10)
-        surf = self.font.render(self.text, True, (230, 230, 230))
+        surf = render_text(self.font, self.text, (230, 230, 230))
         screen.blit(surf, surf.get_rect(center=self.rect.center))
 
     def handle_event(self, event):
@@ -36,7 +38,7 @@ class TextInput:
         pygame.draw.rect(screen, (120, 120, 120), self.rect, 2, border_radius=8)
         show = self.text if self.text else self.placeholder
         color = (230, 230, 230) if self.text else (140, 140, 140)
-        surf = self.font.render(show, True, color)
+        surf = render_text(self.font, show, color)
         screen.blit(surf, (self.rect.x + 10, self.rect.y + 10))
         if self.active:
             cx = self.rect.x + 10 + surf.get_width() + 2
@@ -59,9 +61,9 @@ class TextInput:
                     self.text += event.unicode
 
 def draw_title(screen, font, title):
-    surf = font.render(title, True, (240, 240, 240))
+    surf = render_text(font, title, (240, 240, 240))
     screen.blit(surf, (30, 25))
 
 def draw_label(screen, font, text, x, y):
-    surf = font.render(text, True, (220, 220, 220))
+    surf = render_text(font, text, (220, 220, 220))
     screen.blit(surf, (x, y))